@@ -0,0 +1,184 @@
+import base64
+import hashlib
+import struct
+import threading
+import time
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+_WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def _large_dom_page(row_count:int) -> str:
+    rows = ''.join(f'<tr id="row{i}"><td class="index">{i}</td><td class="name">name {i}</td><td><a href="#{i}">link {i}</a></td></tr>' for i in range(row_count))
+    return f'''<!DOCTYPE html>
+<html><head><title>large dom</title></head>
+<body><h1 id="title">large dom</h1><table id="table">{rows}</table><div id="last">last</div></body></html>'''
+
+
+def _delayed_page(delay_ms:int) -> str:
+    return f'''<!DOCTYPE html>
+<html><head><title>delayed</title></head>
+<body><h1 id="title">delayed</h1>
+<script>
+setTimeout(function () {{
+    const element = document.createElement('div');
+    element.id = 'delayed';
+    element.textContent = 'delayed';
+    document.body.appendChild(element);
+}}, {delay_ms});
+</script></body></html>'''
+
+
+def _spa_page(render_ms:int) -> str:
+    return f'''<!DOCTYPE html>
+<html><head><title>spa</title></head>
+<body><div id="app">loading</div>
+<script>
+function render(route) {{
+    const app = document.getElementById('app');
+    app.innerHTML = '';
+    for (let i = 0; i < 200; i++) {{
+        const item = document.createElement('div');
+        item.className = 'item';
+        item.textContent = route + ' ' + i;
+        app.appendChild(item);
+    }}
+    const done = document.createElement('div');
+    done.id = 'rendered';
+    app.appendChild(done);
+    window.__APP_READY__ = true;
+}}
+setTimeout(function () {{
+    history.pushState({{}}, '', location.pathname + '#home');
+    render('home');
+}}, {render_ms});
+</script></body></html>'''
+
+
+def _websocket_page(frame_count:int, frame_size:int, interval_ms:int) -> str:
+    return f'''<!DOCTYPE html>
+<html><head><title>websocket</title></head>
+<body><div id="count">0</div>
+<script>
+const socket = new WebSocket('ws://' + location.host + '/ws?count={frame_count}&size={frame_size}&interval_ms={interval_ms}');
+let count = 0;
+socket.onmessage = function () {{
+    count++;
+    document.getElementById('count').textContent = String(count);
+}};
+socket.onclose = function () {{
+    const done = document.createElement('div');
+    done.id = 'closed';
+    document.body.appendChild(done);
+}};
+</script></body></html>'''
+
+
+class _FixtureRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+
+        if parsed.path == '/ws':
+            self.__serve_websocket(int(query.get('count', 1000)), int(query.get('size', 64)), int(query.get('interval_ms', 0)))
+            return
+
+        if parsed.path == '/':
+            body = '<!DOCTYPE html><html><head><title>index</title></head><body><h1 id="title">index</h1></body></html>'
+        elif parsed.path == '/large_dom':
+            body = _large_dom_page(int(query.get('rows', 5000)))
+        elif parsed.path == '/delayed':
+            body = _delayed_page(int(query.get('delay_ms', 500)))
+        elif parsed.path == '/spa':
+            body = _spa_page(int(query.get('render_ms', 300)))
+        elif parsed.path == '/websocket':
+            body = _websocket_page(int(query.get('count', 1000)), int(query.get('size', 64)), int(query.get('interval_ms', 0)))
+        else:
+            self.send_error(404)
+            return
+
+        content = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(content)
+
+    def __serve_websocket(self, frame_count:int, frame_size:int, interval_ms:int):
+        key = self.headers.get('Sec-WebSocket-Key')
+        if key is None or self.headers.get('Upgrade', '').lower() != 'websocket':
+            self.send_error(400)
+            return
+
+        accept = base64.b64encode(hashlib.sha1((key + _WEBSOCKET_GUID).encode()).digest()).decode()
+        self.send_response(101)
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept)
+        self.end_headers()
+
+        try:
+            for index in range(frame_count):
+                payload = f'{index}:'.encode().ljust(frame_size, b'x')
+                self.wfile.write(self.__text_frame_header(len(payload)) + payload)
+                if interval_ms:
+                    time.sleep(interval_ms / 1000)
+            # Close frame, status 1000
+            self.wfile.write(b'\x88\x02' + struct.pack('!H', 1000))
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+    def __text_frame_header(self, length:int) -> bytes:
+        if length < 126:
+            return struct.pack('!BB', 0x81, length)
+        if length < 65536:
+            return struct.pack('!BBH', 0x81, 126, length)
+        return struct.pack('!BBQ', 0x81, 127, length)
+
+
+class FixtureServer:
+    '''
+    Local HTTP/websocket server of synthetic pages.\n
+    /large_dom?rows=5000 : table of rows, 'row{i}' ids\n
+    /delayed?delay_ms=500 : '#delayed' is appended after delay\n
+    /spa?render_ms=300 : pushState and render, then window.__APP_READY__ is true\n
+    /websocket?count=1000&size=64&interval_ms=0 : page receiving frames from /ws
+    '''
+    def __init__(self, host:str = '127.0.0.1', port:int = 0) -> None:
+        self.__server = ThreadingHTTPServer((host, port), _FixtureRequestHandler)
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(target=self.__server.serve_forever, name="fixture_server", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def url(self, path:str) -> str:
+        return self.base_url + path
+
+    def start(self) -> 'FixtureServer':
+        self.__thread.start()
+        return self
+
+    def close(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join()
+
+    def __enter__(self) -> 'FixtureServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
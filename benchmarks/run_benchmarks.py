@@ -0,0 +1,291 @@
+'''
+Offline benchmarks of ChromeWebdriver against local fixture server.
+
+python benchmarks/run_benchmarks.py --output result.json
+python benchmarks/run_benchmarks.py --only open,lookup --compare base.json
+'''
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import tempfile
+import importlib.metadata
+
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from selenium.webdriver.common.by import By
+
+from threadingwebdriver import ChromeWebdriver, ElementPresent, JavascriptCondition
+from fixture_server import FixtureServer
+
+
+def summarize(samples:list[float]) -> dict[str, float]:
+    '''
+    Seconds samples to count, mean, min, median, p90, max.
+    '''
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'mean': statistics.fmean(ordered),
+        'min': ordered[0],
+        'median': statistics.median(ordered),
+        'p90': ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))],
+        'max': ordered[-1],
+    }
+
+
+def measure(function:Callable, repeat:int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start_time)
+    return samples
+
+
+class Benchmarks:
+    def __init__(self, server:FixtureServer, args:argparse.Namespace) -> None:
+        self.server = server
+        self.args = args
+        self.base_dir = tempfile.mkdtemp(prefix="threadingwebdriver_benchmark_")
+
+    def create_driver(self, profile_name:str, **options) -> ChromeWebdriver:
+        driver = ChromeWebdriver()
+        driver.initialize(is_headless=True,
+                          profile_name=profile_name,
+                          base_dir=self.base_dir,
+                          is_remove_profile_when_start=True,
+                          is_remove_profile_when_close=True,
+                          **options)
+        return driver
+
+    def cold_start(self) -> dict:
+        '''
+        initialize() of new profile with its startup phases, reset_driver() of initialized driver.
+        '''
+        initialize_samples = []
+        close_samples = []
+        phase_samples:dict[str, list[float]] = {}
+        for index in range(self.args.repeat):
+            driver = ChromeWebdriver()
+            start_time = time.perf_counter()
+            driver.initialize(is_headless=True,
+                              profile_name=f"cold_start{index}",
+                              base_dir=self.base_dir,
+                              is_remove_profile_when_start=True,
+                              is_remove_profile_when_close=True)
+            initialize_samples.append(time.perf_counter() - start_time)
+            for phase, seconds in driver.startup_trace().items():
+                phase_samples.setdefault(phase, []).append(seconds)
+            start_time = time.perf_counter()
+            driver.close()
+            close_samples.append(time.perf_counter() - start_time)
+
+        driver = self.create_driver("reset_driver")
+        try:
+            reset_samples = measure(lambda: driver.reset_driver(True), self.args.repeat)
+        finally:
+            driver.close()
+        return {
+            'initialize': summarize(initialize_samples),
+            'initialize_phases': {phase: summarize(samples) for phase, samples in phase_samples.items()},
+            'reset_driver': summarize(reset_samples),
+            'close': summarize(close_samples),
+        }
+
+    def open(self) -> dict:
+        '''
+        open() latency of fixture pages with their ready conditions.
+        '''
+        timeout = self.args.timeout
+        pages = {
+            'index': (self.server.url('/'), None),
+            'large_dom': (self.server.url(f'/large_dom?rows={self.args.rows}'), ElementPresent(By.ID, 'last')),
+            'delayed': (self.server.url('/delayed?delay_ms=200'), ElementPresent(By.ID, 'delayed')),
+            'spa': (self.server.url('/spa?render_ms=200'), JavascriptCondition("window.__APP_READY__ === true")),
+        }
+        result = {}
+        driver = self.create_driver("open")
+        try:
+            for name, (url, ready_condition) in pages.items():
+                samples = []
+                for _ in range(self.args.repeat):
+                    start_time = time.perf_counter()
+                    if not driver.open(timeout, url, ready_condition=ready_condition):
+                        raise RuntimeError(f"open failed: {url}")
+                    samples.append(time.perf_counter() - start_time)
+                    # Leave page, so next open() is real navigation.
+                    driver.open(timeout, 'about:blank')
+                result[name] = summarize(samples)
+        finally:
+            driver.close()
+        return result
+
+    def lookup(self) -> dict:
+        '''
+        Element lookups per second of large dom by read_thread_count.
+        '''
+        timeout = self.args.timeout
+        url = self.server.url(f'/large_dom?rows={self.args.rows}')
+        lookup_count = self.args.lookups
+        result = {}
+        for read_thread_count in self.args.read_thread_counts:
+            driver = self.create_driver(f"lookup{read_thread_count}", read_thread_count=read_thread_count)
+            try:
+                driver.open(timeout, url, ready_condition=ElementPresent(By.ID, 'last'))
+                samples = []
+                for _ in range(self.args.repeat):
+                    start_time = time.perf_counter()
+                    async_results = [driver.get_element_xpath_async(timeout, f'//*[@id="row{index % self.args.rows}"]') for index in range(lookup_count)]
+                    for async_result in async_results:
+                        if async_result.get() is None:
+                            raise RuntimeError("lookup failed")
+                    samples.append(time.perf_counter() - start_time)
+                summary = summarize(samples)
+                summary['lookups_per_second'] = lookup_count / summary['median']
+                result[str(read_thread_count)] = summary
+            finally:
+                driver.close()
+        return result
+
+    def screenshot(self) -> dict:
+        '''
+        save_screenshot() of index and large dom.
+        '''
+        timeout = self.args.timeout
+        result = {}
+        driver = self.create_driver("screenshot")
+        try:
+            for name, url in (('index', self.server.url('/')), ('large_dom', self.server.url(f'/large_dom?rows={self.args.rows}'))):
+                driver.open(timeout, url, ready_condition=ElementPresent(By.ID, 'title'))
+                filename = os.path.join(self.base_dir, f"{name}.png")
+                samples = measure(lambda: driver.save_screenshot(filename), self.args.repeat)
+                summary = summarize(samples)
+                summary['file_bytes'] = os.path.getsize(filename) if os.path.exists(filename) else 0
+                result[name] = summary
+        finally:
+            driver.close()
+        return result
+
+    def websocket(self) -> dict:
+        '''
+        Captured websocket frames per second.
+        '''
+        timeout = self.args.timeout
+        frame_count = self.args.frames
+        url = self.server.url(f'/websocket?count={frame_count}&size={self.args.frame_size}&interval_ms=0')
+        driver = self.create_driver("websocket")
+        try:
+            capture = driver.start_websocket_capture(buffer_size=frame_count, overflow_policy='block')
+            start_time = time.perf_counter()
+            driver.open(timeout, url, ready_condition=ElementPresent(By.ID, 'closed'))
+            received_count = 0
+            while received_count < frame_count:
+                batch = capture.get_batch(timeout)
+                if not batch:
+                    break
+                received_count += len(batch)
+            elapsed = time.perf_counter() - start_time
+            stats = capture.stats()
+            capture.close()
+        finally:
+            driver.close()
+        return {
+            'frame_count': frame_count,
+            'received_count': received_count,
+            'dropped_count': stats['dropped_count'],
+            'seconds': elapsed,
+            'frames_per_second': received_count / elapsed if elapsed else 0,
+        }
+
+
+def package_version() -> str | None:
+    try:
+        return importlib.metadata.version('threadingwebdriver')
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+BENCHMARK_NAMES = ('cold_start', 'open', 'lookup', 'screenshot', 'websocket')
+
+
+def compare(result:dict, base:dict, threshold:float) -> list[str]:
+    '''
+    Medians slower than base by more than threshold ratio.
+    '''
+    regressions = []
+    def walk(current:dict, previous:dict, path:str):
+        for key, value in current.items():
+            previous_value = previous.get(key) if isinstance(previous, dict) else None
+            if isinstance(value, dict) and isinstance(previous_value, dict):
+                walk(value, previous_value, f"{path}.{key}" if path else key)
+            elif key == 'median' and isinstance(previous_value, (int, float)) and 0 < previous_value:
+                ratio = value / previous_value
+                if 1 + threshold < ratio:
+                    regressions.append(f"{path}: {previous_value:.4f}s -> {value:.4f}s ({ratio:.2f}x)")
+    walk(result['results'], base.get('results', {}), "")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default=None, help="json result file. default: stdout")
+    parser.add_argument('--only', default=','.join(BENCHMARK_NAMES), help="comma separated benchmarks")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--rows', type=int, default=5000, help="rows of large dom page")
+    parser.add_argument('--lookups', type=int, default=200, help="lookups per repeat")
+    parser.add_argument('--read-thread-counts', default='1,2,4,8')
+    parser.add_argument('--frames', type=int, default=5000)
+    parser.add_argument('--frame-size', type=int, default=64)
+    parser.add_argument('--compare', default=None, help="previous json result. exit 1 if regression")
+    parser.add_argument('--threshold', type=float, default=0.2, help="regression ratio of median")
+    args = parser.parse_args()
+    args.read_thread_counts = [int(count) for count in args.read_thread_counts.split(',')]
+
+    names = [name for name in args.only.split(',') if name]
+    for name in names:
+        if name not in BENCHMARK_NAMES:
+            parser.error(f"Unknown benchmark: {name}")
+
+    result = {
+        'version': package_version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.time(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'results': {},
+    }
+    with FixtureServer() as server:
+        benchmarks = Benchmarks(server, args)
+        for name in names:
+            print(f"benchmark: {name}", file=sys.stderr)
+            result['results'][name] = getattr(benchmarks, name)()
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            base = json.load(file)
+        regressions = compare(result, base, args.threshold)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import sys
+
+import pytest
+from selenium.common.exceptions import InvalidSelectorException
+
+from threadingwebdriver import DomSnapshot
+
+HTML = '''
+<html>
+<head><title>Table</title></head>
+<body>
+<table id="items">
+<tr class="row first"><td class="name">apple</td><td>1</td></tr>
+<tr class="row"><td class="name">banana<br>split</td><td>2</td></tr>
+</table>
+<div><p data-kind="note">first</p><p>unclosed</div>
+<img src="a.png">
+</body>
+</html>
+'''
+
+
+@pytest.fixture(params=['lxml', 'fallback'])
+def snapshot(request, monkeypatch) -> DomSnapshot:
+    if request.param == 'lxml':
+        pytest.importorskip('lxml.html')
+    else:
+        monkeypatch.setitem(sys.modules, 'lxml', None)
+        monkeypatch.setitem(sys.modules, 'lxml.html', None)
+    return DomSnapshot(HTML, 'https://example.com/')
+
+
+def test_xpath(snapshot:DomSnapshot):
+    names = snapshot.xpath('//table//tr/td[1]')
+    assert [name.text for name in names] == ['apple', 'bananasplit']
+    assert snapshot.find_xpath('/html/body/table').get_attribute('id') == 'items'
+    assert snapshot.find_xpath('//span') is None
+
+
+def test_css(snapshot:DomSnapshot):
+    assert [td.text for td in snapshot.css('table tr > td.name')] == ['apple', 'bananasplit']
+    assert snapshot.find_css('tr.row.first').attributes == {'class': 'row first'}
+    assert [p.text for p in snapshot.css('div > p')] == ['first', 'unclosed']
+    assert snapshot.find_css('p[data-kind=note]').tag == 'p'
+    assert [element.tag for element in snapshot.css('title, img')] == ['title', 'img']
+
+
+def test_query_from_element(snapshot:DomSnapshot):
+    table = snapshot.find_css('#items')
+    assert len(table.css('td')) == 4
+    assert [td.text for td in table.xpath('.//td[@class="name"]')] == ['apple', 'bananasplit']
+
+
+def test_void_element_has_no_children(snapshot:DomSnapshot):
+    assert snapshot.css('img > *') == []
+    assert snapshot.css('br > *') == []
+
+
+def test_empty_html(snapshot:DomSnapshot):
+    empty = DomSnapshot('', 'about:blank')
+    assert empty.xpath('//p') == []
+    assert empty.css('p') == []
+
+
+def test_unsupported_fallback_selector_raises(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'lxml', None)
+    monkeypatch.setitem(sys.modules, 'lxml.html', None)
+    snapshot = DomSnapshot(HTML, 'https://example.com/')
+    with pytest.raises(InvalidSelectorException):
+        snapshot.css('tr:first-child')
+    with pytest.raises(InvalidSelectorException):
+        snapshot.xpath('//td[position() = 1]')
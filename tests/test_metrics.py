@@ -0,0 +1,56 @@
+import threading
+
+from threadingwebdriver import Histogram, Metrics
+
+
+def test_histogram_bucket_boundaries():
+    histogram = Histogram()
+    # Bucket is 'less than or equal', so boundary value counts in its own bucket.
+    histogram.observe(0.0)
+    histogram.observe(Histogram.buckets[0])
+    histogram.observe(0.0051)
+    histogram.observe(Histogram.buckets[-1])
+    histogram.observe(Histogram.buckets[-1] + 0.001)
+    assert len(histogram.bucket_counts) == len(Histogram.buckets) + 1
+    assert histogram.bucket_counts[0] == 2
+    assert histogram.bucket_counts[1] == 1
+    assert histogram.bucket_counts[len(Histogram.buckets) - 1] == 1
+    assert histogram.bucket_counts[-1] == 1
+    assert histogram.count == 5
+    assert abs(histogram.sum - (0.005 + 0.0051 + 60.0 + 60.001)) < 1e-9
+
+
+def test_snapshot_is_cumulative():
+    metrics = Metrics()
+    for seconds in (0.001, 0.02, 0.02, 3.0, 100.0):
+        metrics.observe('open', seconds)
+    metrics.increment('read_timeout')
+    metrics.increment('read_timeout', 2)
+    snapshot = metrics.snapshot()
+    buckets = snapshot['operations']['open']['buckets']
+    assert buckets[0.005] == 1
+    assert buckets[0.01] == 1
+    assert buckets[0.025] == 3
+    assert buckets[5.0] == 4
+    assert buckets[60.0] == 4
+    assert buckets[float('inf')] == 5
+    assert snapshot['operations']['open']['count'] == 5
+    assert snapshot['counters'] == {'read_timeout': 3}
+
+
+def test_metrics_thread_safe():
+    metrics = Metrics()
+
+    def observe():
+        for _ in range(1000):
+            metrics.observe('read', 0.01)
+            metrics.increment('read_error')
+
+    threads = [threading.Thread(target=observe) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    snapshot = metrics.snapshot()
+    assert snapshot['operations']['read']['count'] == 8000
+    assert snapshot['counters']['read_error'] == 8000
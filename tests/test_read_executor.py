@@ -0,0 +1,156 @@
+import threading
+import time
+
+import pytest
+from selenium.common.exceptions import TimeoutException
+
+from threadingwebdriver import CancelToken, ReadCancelled, ReadExecutor, ReadFuture
+
+
+def block_worker(executor:ReadExecutor) -> tuple[threading.Event, ReadFuture]:
+    '''
+    Occupy a worker until returned event is set.
+    '''
+    started_event = threading.Event()
+    release_event = threading.Event()
+
+    def block():
+        started_event.set()
+        release_event.wait(5)
+
+    future = executor.submit(ReadFuture(), block)
+    assert started_event.wait(5)
+    return release_event, future
+
+
+def wait_until(predicate, timeout:float = 5) -> bool:
+    end_time = time.monotonic() + timeout
+    while not predicate():
+        if end_time < time.monotonic():
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def executor():
+    executor = ReadExecutor(max_workers=1, min_workers=1, idle_timeout=0.1)
+    yield executor
+    executor.close()
+    executor.join()
+
+
+def test_higher_priority_runs_first(executor:ReadExecutor):
+    release_event, blocker = block_worker(executor)
+    order = []
+    futures = [executor.submit(ReadFuture(priority), order.append, name)
+               for priority, name in ((0, 'low'), (5, 'high'), (0, 'low2'), (1, 'middle'))]
+    release_event.set()
+    for future in futures + [blocker]:
+        future.get(5)
+    assert order == ['high', 'middle', 'low', 'low2']
+
+
+def test_cancel_pending_read(executor:ReadExecutor):
+    release_event, blocker = block_worker(executor)
+    future = executor.submit(ReadFuture(), lambda: 'value')
+    assert future.cancel()
+    assert future.done()
+    with pytest.raises(ReadCancelled):
+        future.get(0)
+    release_event.set()
+    blocker.get(5)
+    assert not future.cancel()
+
+
+def test_cancel_token_finishes_pending_reads(executor:ReadExecutor):
+    release_event, blocker = block_worker(executor)
+    token = CancelToken()
+    futures = [executor.submit(ReadFuture(cancel_token=token), lambda: 'value') for _ in range(3)]
+    token.cancel()
+    for future in futures:
+        with pytest.raises(ReadCancelled):
+            future.get(0)
+    # Issued after cancel
+    late_future = ReadFuture(cancel_token=token)
+    with pytest.raises(ReadCancelled):
+        late_future.get(0)
+    release_event.set()
+    blocker.get(5)
+
+
+def test_running_read_stops_at_check(executor:ReadExecutor):
+    future = ReadFuture()
+    started_event = threading.Event()
+
+    def poll():
+        started_event.set()
+        while True:
+            future.check()
+            time.sleep(0.01)
+
+    executor.submit(future, poll)
+    assert started_event.wait(5)
+    assert future.cancel()
+    with pytest.raises(ReadCancelled):
+        future.get(5)
+
+
+def test_deadline_expires_on_queued_read(executor:ReadExecutor):
+    release_event, blocker = block_worker(executor)
+    future = executor.submit(ReadFuture(timeout=0.1), lambda: 'value')
+    # Finished by deadline thread while worker is still busy.
+    assert future.wait(5)
+    with pytest.raises(TimeoutException):
+        future.get(0)
+    assert not blocker.done()
+    release_event.set()
+    blocker.get(5)
+
+
+def test_result_and_exception(executor:ReadExecutor):
+    assert executor.submit(ReadFuture(), lambda a, b: a + b, 1, 2).get(5) == 3
+
+    def fail():
+        raise ValueError("failed")
+
+    future = executor.submit(ReadFuture(), fail)
+    with pytest.raises(ValueError):
+        future.get(5)
+    assert not future.successful()
+
+
+def test_workers_grow_and_shrink():
+    executor = ReadExecutor(max_workers=3, min_workers=1, idle_timeout=0.1)
+    try:
+        release_event = threading.Event()
+        started_count = 0
+        started_lock = threading.Lock()
+
+        def block():
+            nonlocal started_count
+            with started_lock:
+                started_count += 1
+            release_event.wait(5)
+
+        futures = [executor.submit(ReadFuture(), block) for _ in range(5)]
+        assert wait_until(lambda: started_count == 3)
+        assert executor.stats()['worker_count'] == 3
+        assert executor.stats()['pending_count'] == 2
+
+        release_event.set()
+        for future in futures:
+            future.get(5)
+        assert wait_until(lambda: executor.stats()['worker_count'] == 1)
+    finally:
+        executor.close()
+        executor.join()
+    assert executor.stats()['worker_count'] == 0
+
+
+def test_submit_after_close_raises():
+    executor = ReadExecutor(max_workers=1)
+    executor.close()
+    executor.join()
+    with pytest.raises(ValueError):
+        executor.submit(ReadFuture(), lambda: None)
@@ -1,36 +1,2187 @@
+from __future__ import annotations
+
+import time
+_IMPORT_START_TIME = time.perf_counter()
+
 import os
+import sys
+import abc
+import json
+import shutil
+import base64
+import hashlib
+import tempfile
+import uuid
+import contextlib
 import subprocess
-import inspect
 import platform
-import requests
-import zipfile
 import threading
-import trio
+import re
+import bisect
+import heapq
+import itertools
+import queue
+import collections
+import functools
 
-from multiprocessing.pool import ThreadPool, AsyncResult
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Iterable, Iterator, NamedTuple
+
+from concurrent.futures import ThreadPoolExecutor, Future
 
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.wait import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException, InvalidSelectorException, InvalidSessionIdException
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.alert import Alert
 
-class WebElementAsyncResult:
-    def __init__(self, ar:AsyncResult) -> None:
+# trio, requests, zipfile, multiprocessing.pool, asyncio, snapshot fallback parsers and selenium waits(which load devtools bindings)
+# are imported in functions using them.
+if TYPE_CHECKING:
+    import asyncio
+    import trio
+    from multiprocessing.pool import ThreadPool, AsyncResult
+
+# Same as selenium.webdriver.support.wait.POLL_FREQUENCY
+POLL_FREQUENCY:float = 0.5
+
+# findElements(by, value, isFirst): Array of elements by selenium locator strategy
+_FIND_ELEMENTS_FUNCTION = '''
+function findElements(by, value, isFirst) {
+    const first = (element) => element ? [element] : [];
+    switch (by) {
+        case 'xpath':
+            if (isFirst) {
+                return first(document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue);
+            } else {
+                const snapshot = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+                const elements = [];
+                for (let i = 0; i < snapshot.snapshotLength; i++) {
+                    elements.push(snapshot.snapshotItem(i));
+                }
+                return elements;
+            }
+        case 'id':
+            return isFirst ? first(document.getElementById(value)) : Array.from(document.querySelectorAll('[id]')).filter(e => e.id === value);
+        case 'css selector':
+            return isFirst ? first(document.querySelector(value)) : Array.from(document.querySelectorAll(value));
+        case 'tag name':
+            return Array.from(document.getElementsByTagName(value)).slice(0, isFirst ? 1 : undefined);
+        case 'class name':
+            return Array.from(document.getElementsByClassName(value)).slice(0, isFirst ? 1 : undefined);
+        case 'name':
+            return Array.from(document.getElementsByName(value)).slice(0, isFirst ? 1 : undefined);
+        case 'link text':
+            return Array.from(document.links).filter(a => a.innerText.trim() === value).slice(0, isFirst ? 1 : undefined);
+        case 'partial link text':
+            return Array.from(document.links).filter(a => a.innerText.includes(value)).slice(0, isFirst ? 1 : undefined);
+        default:
+            throw new Error('Unsupported locator strategy: ' + by);
+    }
+}
+'''
+
+# arguments[0]: [[name, by, value, property_name, is_all], ...]
+# return: [{name: element, elements or element[property_name]} of found locators, {name: error message}]
+_FIND_ELEMENTS_BATCH_SCRIPT = _FIND_ELEMENTS_FUNCTION + '''
+const result = {};
+const errors = {};
+for (const [name, by, value, propertyName, isAll] of arguments[0]) {
+    let elements = null;
+    try {
+        elements = findElements(by, value, !isAll);
+    } catch (e) {
+        errors[name] = String(e);
+        continue;
+    }
+    if (0 < elements.length) {
+        if (isAll) {
+            result[name] = propertyName ? elements.map(e => e[propertyName]) : elements;
+        } else {
+            result[name] = propertyName ? elements[0][propertyName] : elements[0];
+        }
+    }
+}
+return [result, errors];
+'''
+
+# arguments: by, value, is_all, timeout_ms, callback
+# callback: element, elements or null(timeout). Wait by MutationObserver instead of polling.
+_WAIT_ELEMENTS_SCRIPT = _FIND_ELEMENTS_FUNCTION + '''
+const [by, value, isAll, timeoutMs, callback] = arguments;
+const find = () => {
+    const elements = findElements(by, value, !isAll);
+    if (elements.length === 0) {
+        return null;
+    }
+    return isAll ? elements : elements[0];
+};
+const found = find();
+if (found !== null) {
+    callback(found);
+} else {
+    let timer = null;
+    const observer = new MutationObserver(() => {
+        const found = find();
+        if (found !== null) {
+            observer.disconnect();
+            clearTimeout(timer);
+            callback(found);
+        }
+    });
+    observer.observe(document, {childList: true, subtree: true, attributes: true});
+    timer = setTimeout(() => {
+        observer.disconnect();
+        callback(null);
+    }, timeoutMs);
+}
+'''
+
+class Histogram:
+    '''
+    Fixed bucket histogram of seconds.
+    '''
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+    
+    def __init__(self) -> None:
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, value:float):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class Metrics:
+    '''
+    Latency histograms of operations and event counters. Thread safe.
+    '''
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__histograms:dict[str, Histogram] = {}
+        self.__counters:dict[str, int] = {}
+    
+    def observe(self, operation:str, seconds:float):
+        with self.__lock:
+            histogram = self.__histograms.get(operation)
+            if histogram is None:
+                histogram = self.__histograms[operation] = Histogram()
+            histogram.observe(seconds)
+    
+    def increment(self, event:str, count:int = 1):
+        with self.__lock:
+            self.__counters[event] = self.__counters.get(event, 0) + count
+    
+    def snapshot(self) -> dict[str, dict]:
+        '''
+        return
+        -
+        (dict): {'operations': {operation: {'count', 'sum', 'buckets': {le: cumulative count}}}, 'counters': {event: count}}
+        '''
+        with self.__lock:
+            operations = {}
+            for operation, histogram in self.__histograms.items():
+                cumulative_count = 0
+                buckets = {}
+                for le, bucket_count in zip(Histogram.buckets + (float('inf'),), histogram.bucket_counts):
+                    cumulative_count += bucket_count
+                    buckets[le] = cumulative_count
+                operations[operation] = {'count': histogram.count, 'sum': histogram.sum, 'buckets': buckets}
+            return {'operations': operations, 'counters': dict(self.__counters)}
+
+
+def _measure(function:Callable) -> Callable:
+    '''
+    Observe latency of public method of ChromeWebdriver in its metrics.
+    '''
+    operation = function.__name__
+    
+    @functools.wraps(function)
+    def measured_function(self, *args, **kwargs):
+        start_time = time.perf_counter()
+        try:
+            return function(self, *args, **kwargs)
+        finally:
+            self.metrics.observe(operation, time.perf_counter() - start_time)
+    return measured_function
+
+
+def _caller_directory(depth:int) -> str:
+    '''
+    Directory of file of caller, 'depth' frames above function calling this.\n
+    sys._getframe() doesn't read source of every frame like inspect.stack().
+    '''
+    return '/'.join(sys._getframe(depth + 1).f_code.co_filename.split('/')[:-1])
+
+
+@contextlib.contextmanager
+def _startup_phase(phases:dict[str, float] | None, phase:str):
+    '''
+    Add seconds of block to phases[phase]. Nothing if phases is None.
+    '''
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        if phases is not None:
+            phases[phase] = phases.get(phase, 0.0) + time.perf_counter() - start_time
+
+
+def _sample_process_tree(pid:int) -> dict[str, float] | None:
+    '''
+    Process count, RSS bytes and CPU seconds of process and its descendants.\n
+    Use psutil if installed, otherwise /proc (Linux). None if not available.
+    '''
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    
+    if psutil:
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return None
+        rss_bytes = 0
+        cpu_seconds = 0.0
+        for process in processes:
+            try:
+                rss_bytes += process.memory_info().rss
+                cpu_times = process.cpu_times()
+                cpu_seconds += cpu_times.user + cpu_times.system
+            except psutil.Error:
+                pass
+        return {'process_count': len(processes), 'rss_bytes': rss_bytes, 'cpu_seconds': cpu_seconds}
+    
+    if not os.path.isdir('/proc'):
+        return None
+    
+    children:dict[int, list[int]] = {}
+    stats:dict[int, list[str]] = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat', 'r') as file:
+                stat = file.read()
+        except OSError:
+            continue
+        # Fields after command name '(...)'.
+        fields = stat[stat.rfind(')') + 2:].split()
+        stats[int(name)] = fields
+        children.setdefault(int(fields[1]), []).append(int(name))
+    
+    if pid not in stats:
+        return None
+    
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    clock_ticks = os.sysconf('SC_CLK_TCK')
+    process_count = 0
+    rss_bytes = 0
+    cpu_seconds = 0.0
+    pids = [pid]
+    while pids:
+        current_pid = pids.pop()
+        fields = stats.get(current_pid)
+        if fields is None:
+            continue
+        process_count += 1
+        cpu_seconds += (int(fields[11]) + int(fields[12])) / clock_ticks
+        rss_bytes += int(fields[21]) * page_size
+        pids.extend(children.get(current_pid, []))
+    return {'process_count': process_count, 'rss_bytes': rss_bytes, 'cpu_seconds': cpu_seconds}
+
+
+class NavigationEpochExpired(Exception):
+    '''
+    Read task is cancelled because newer navigation is started.
+    '''
+    pass
+
+class ReadCancelled(Exception):
+    '''
+    Read task is cancelled by cancel() or its CancelToken.
+    '''
+    pass
+
+
+class CancelToken:
+    '''
+    Cancel group of reads. Pending reads are finished with ReadCancelled at once, and running reads stop at next poll.
+    '''
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__is_cancelled = False
+        self.__futures:set[ReadFuture] = set()
+    
+    def cancel(self):
+        with self.__lock:
+            self.__is_cancelled = True
+            futures = list(self.__futures)
+            self.__futures.clear()
+        for future in futures:
+            future.cancel()
+    
+    def is_cancelled(self) -> bool:
+        return self.__is_cancelled
+    
+    def _register(self, future:ReadFuture):
+        with self.__lock:
+            is_cancelled = self.__is_cancelled
+            if not is_cancelled:
+                self.__futures.add(future)
+        if is_cancelled:
+            future.cancel()
+        else:
+            future.add_done_callback(self.__unregister)
+    
+    def __unregister(self, future:ReadFuture):
+        with self.__lock:
+            self.__futures.discard(future)
+
+
+class _ReadDeadlines:
+    '''
+    One thread finishing pending reads with TimeoutException when their deadline is passed.
+    Running reads check deadline between polls.
+    '''
+    def __init__(self) -> None:
+        self.__condition = threading.Condition()
+        self.__heap:list[tuple[float, int, ReadFuture]] = []
+        self.__sequence = itertools.count()
+        self.__thread:threading.Thread = None
+    
+    def add(self, future:ReadFuture):
+        with self.__condition:
+            heapq.heappush(self.__heap, (future.deadline, next(self.__sequence), future))
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__run, name="read_deadline", daemon=True)
+                self.__thread.start()
+            self.__condition.notify()
+    
+    def __run(self):
+        while True:
+            with self.__condition:
+                while True:
+                    if self.__heap and self.__heap[0][2].done():
+                        heapq.heappop(self.__heap)
+                        continue
+                    timeout = self.__heap[0][0] - time.monotonic() if self.__heap else None
+                    if timeout is not None and timeout <= 0:
+                        _, _, future = heapq.heappop(self.__heap)
+                        break
+                    self.__condition.wait(timeout)
+            future._finish(exception=TimeoutException("Read deadline is exceeded before start"), is_pending_only=True)
+
+
+_read_deadlines = _ReadDeadlines()
+
+
+class ReadFuture:
+    '''
+    Result of read task. get()/wait()/ready()/successful() like AsyncResult, with cancel() and deadline.
+    '''
+    def __init__(self, priority:int = 0, timeout:float = None, cancel_token:CancelToken = None) -> None:
+        self.priority = priority
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.cancel_token = cancel_token
+        self.__lock = threading.Lock()
+        self.__event = threading.Event()
+        self.__state = 'pending'
+        self.__is_cancelled = False
+        self.__value = None
+        self.__exception:BaseException = None
+        self.__callbacks:list[Callable[['ReadFuture'], Any]] = []
+        if self.deadline is not None:
+            _read_deadlines.add(self)
+        if cancel_token is not None:
+            cancel_token._register(self)
+    
+    def cancel(self) -> bool:
+        '''
+        Cancel pending read, or stop running read at next poll.\n
+        return
+        -
+        (bool): False if already done
+        '''
+        with self.__lock:
+            if self.__state == 'done':
+                return False
+            self.__is_cancelled = True
+        self._finish(exception=ReadCancelled("Read is cancelled before start"), is_pending_only=True)
+        return True
+    
+    def is_cancelled(self) -> bool:
+        return self.__is_cancelled or (self.cancel_token is not None and self.cancel_token.is_cancelled())
+    
+    def check(self):
+        '''
+        Raise ReadCancelled or TimeoutException. Called between polls of running read.
+        '''
+        if self.is_cancelled():
+            raise ReadCancelled("Read is cancelled")
+        if self.deadline is not None and self.deadline < time.monotonic():
+            raise TimeoutException("Read deadline is exceeded")
+    
+    def done(self) -> bool:
+        return self.__event.is_set()
+    
+    def ready(self) -> bool:
+        return self.__event.is_set()
+    
+    def successful(self) -> bool:
+        if not self.ready():
+            raise ValueError(f"{self!r} not ready")
+        return self.__exception is None
+    
+    def wait(self, timeout:float = None) -> bool:
+        return self.__event.wait(timeout)
+    
+    def get(self, timeout:float = None) -> Any:
+        if not self.__event.wait(timeout):
+            raise TimeoutError()
+        if self.__exception is not None:
+            raise self.__exception
+        return self.__value
+    
+    def add_done_callback(self, callback:Callable[['ReadFuture'], Any]):
+        with self.__lock:
+            if self.__state != 'done':
+                self.__callbacks.append(callback)
+                return
+        callback(self)
+    
+    def _run(self, function:Callable, args:tuple):
+        with self.__lock:
+            if self.__state != 'pending':
+                return
+            self.__state = 'running'
+        try:
+            self.check()
+            value = function(*args)
+        except BaseException as e:
+            self._finish(exception=e)
+        else:
+            self._finish(value=value)
+    
+    def _finish(self, value:Any = None, exception:BaseException = None, is_pending_only:bool = False):
+        '''
+        is_pending_only (bool): finish only if read is not started. Running read finishes itself.
+        '''
+        with self.__lock:
+            if self.__state == 'done' or (is_pending_only and self.__state != 'pending'):
+                return
+            self.__state = 'done'
+            self.__value = value
+            self.__exception = exception
+            callbacks = self.__callbacks
+            self.__callbacks = []
+        self.__event.set()
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"Read callback failed. {type(e).__name__}: {e}")
+
+
+class ReadExecutor:
+    '''
+    Priority queue of read tasks with elastic worker threads.\n
+    Higher priority runs first, same priority in submitted order.
+    Workers grow up to max_workers while tasks wait, and shrink to min_workers after idle_timeout seconds.
+    '''
+    def __init__(self, max_workers:int, min_workers:int = 1, idle_timeout:float = 30, name:str = "read") -> None:
+        self.__max_workers = max(1, max_workers)
+        self.__min_workers = min(max(0, min_workers), self.__max_workers)
+        self.__idle_timeout = idle_timeout
+        self.__name = name
+        self.__condition = threading.Condition()
+        self.__heap:list[tuple] = []
+        self.__sequence = itertools.count()
+        self.__workers:set[threading.Thread] = set()
+        self.__idle_count = 0
+        self.__is_closed = False
+        with self.__condition:
+            for _ in range(self.__min_workers):
+                self.__start_worker()
+    
+    def submit(self, future:ReadFuture, function:Callable, *args) -> ReadFuture:
+        with self.__condition:
+            if self.__is_closed:
+                raise ValueError("Read executor is closed")
+            heapq.heappush(self.__heap, (-future.priority, next(self.__sequence), future, function, args))
+            if self.__idle_count < len(self.__heap) and len(self.__workers) < self.__max_workers:
+                self.__start_worker()
+            self.__condition.notify()
+        return future
+    
+    def close(self):
+        '''
+        Stop accepting tasks. Submitted tasks still run.
+        '''
+        with self.__condition:
+            self.__is_closed = True
+            self.__condition.notify_all()
+    
+    def join(self):
+        with self.__condition:
+            self.__condition.wait_for(lambda: not self.__workers)
+    
+    def stats(self) -> dict[str, int]:
+        with self.__condition:
+            return {'worker_count': len(self.__workers), 'idle_count': self.__idle_count, 'pending_count': len(self.__heap)}
+    
+    def __start_worker(self):
+        thread = threading.Thread(target=self.__work, name=f"{self.__name}_{next(self.__sequence)}", daemon=True)
+        self.__workers.add(thread)
+        thread.start()
+    
+    def __work(self):
+        current_thread = threading.current_thread()
+        while True:
+            with self.__condition:
+                while not self.__heap and not self.__is_closed:
+                    self.__idle_count += 1
+                    is_notified = self.__condition.wait(self.__idle_timeout)
+                    self.__idle_count -= 1
+                    if not is_notified and not self.__heap and self.__min_workers < len(self.__workers):
+                        self.__workers.discard(current_thread)
+                        return
+                if not self.__heap:
+                    self.__workers.discard(current_thread)
+                    self.__condition.notify_all()
+                    return
+                _, _, future, function, args = heapq.heappop(self.__heap)
+            future._run(function, args)
+
+
+class ReadAsyncResult:
+    '''
+    Wrapper of ReadFuture, or AsyncResult of navigation which is not cancellable.
+    '''
+    def __init__(self, ar:ReadFuture | AsyncResult) -> None:
         self.__ar = ar
     
-    def get(self) -> WebElement:
+    def get(self) -> Any:
         return self.__ar.get()
+    
+    def cancel(self) -> bool:
+        '''
+        Cancel pending read, or stop running read at next poll. get() raises ReadCancelled.\n
+        return
+        -
+        (bool): False if already done or not cancellable
+        '''
+        cancel = getattr(self.__ar, 'cancel', None)
+        return cancel() if cancel else False
+    
+    def done(self) -> bool:
+        return self.__ar.ready()
 
-class BoolAsyncResult:
-    def __init__(self, ar:AsyncResult) -> None:
-        self.__ar = ar
+class WebElementAsyncResult(ReadAsyncResult):
+    def get(self) -> WebElement:
+        return super().get()
+
+class ElementsAsyncResult(ReadAsyncResult):
+    def get(self) -> dict[str, Any]:
+        return super().get()
+
+class BoolAsyncResult(ReadAsyncResult):
+    def get(self) -> bool:
+        return super().get()
+
+class NavigationState:
+    '''
+    Url and lifecycle events of main frame, updated by CDP events.
+    '''
+    def __init__(self) -> None:
+        self.__condition = threading.Condition()
+        self.__lifecycle_events_by_loader:collections.OrderedDict[str, set[str]] = collections.OrderedDict()
+        self.is_connected = False
+        self.url = ""
+        self.loader_id = ""
+        self.navigation_count = 0
+        # Same document navigations(fragment, history API). navigation_count counts new documents only.
+        self.within_document_navigation_count = 0
+        self.__listeners:list[Callable[[], Any]] = []
+    
+    @property
+    def lifecycle_events(self) -> set[str]:
+        '''
+        Lifecycle events of current document. 'DOMContentLoaded', 'load', 'networkAlmostIdle', 'networkIdle', ...
+        '''
+        return self.__lifecycle_events_by_loader.get(self.loader_id, set())
+    
+    def reset(self, url:str, loader_id:str):
+        with self.__condition:
+            self.is_connected = True
+            self.url = url
+            self.loader_id = loader_id
+            self.__lifecycle_events_by_loader.clear()
+            self.__notify()
+    
+    def disconnect(self):
+        with self.__condition:
+            self.is_connected = False
+            self.__notify()
+    
+    def set_url(self, url:str, is_new_document:bool, loader_id:str = None):
+        with self.__condition:
+            self.url = url
+            if is_new_document:
+                self.navigation_count += 1
+                self.loader_id = loader_id
+            else:
+                self.within_document_navigation_count += 1
+            self.__notify()
+    
+    def add_lifecycle_event(self, loader_id:str, name:str):
+        with self.__condition:
+            if loader_id not in self.__lifecycle_events_by_loader:
+                self.__lifecycle_events_by_loader[loader_id] = set()
+                if 8 < len(self.__lifecycle_events_by_loader):
+                    self.__lifecycle_events_by_loader.popitem(last=False)
+            self.__lifecycle_events_by_loader[loader_id].add(name)
+            self.__notify()
+    
+    def add_listener(self, listener:Callable[[], Any]):
+        '''
+        listener() is called in devtools thread when state is changed. It must not block.
+        '''
+        with self.__condition:
+            self.__listeners.append(listener)
+    
+    def remove_listener(self, listener:Callable[[], Any]):
+        with self.__condition:
+            if listener in self.__listeners:
+                self.__listeners.remove(listener)
+    
+    def __notify(self):
+        self.__condition.notify_all()
+        for listener in self.__listeners:
+            try:
+                listener()
+            except Exception as e:
+                print(f"Navigation state listener failed. {type(e).__name__}: {e}")
+    
+    def wait_for(self, predicate:Callable[['NavigationState'], bool], timeout:float) -> bool:
+        '''
+        return
+        -
+        (bool): False if timeout or disconnected
+        '''
+        with self.__condition:
+            self.__condition.wait_for(lambda: predicate(self) or not self.is_connected, timeout)
+            return self.is_connected and predicate(self)
+
+
+class ReadyCondition(abc.ABC):
+    '''
+    Readiness predicate of open(). open() returns when it holds after navigation.
+    '''
+    @abc.abstractmethod
+    def is_ready(self, driver:webdriver.Chrome) -> bool:
+        '''
+        Polling check.
+        '''
+    
+    def is_ready_by_event(self, navigation_state:NavigationState) -> bool | None:
+        '''
+        Check by CDP lifecycle events. None if it can't be checked by events.
+        '''
+        return None
+
+
+class DomContentLoaded(ReadyCondition):
+    def is_ready(self, driver:webdriver.Chrome) -> bool:
+        return driver.execute_script("return document.readyState") in ('interactive', 'complete')
+    
+    def is_ready_by_event(self, navigation_state:NavigationState) -> bool | None:
+        return 'DOMContentLoaded' in navigation_state.lifecycle_events
+
+
+class NetworkIdle(ReadyCondition):
+    '''
+    No network response for idle_ms milliseconds.\n
+    With events, it is Chrome 'networkIdle' lifecycle event(idle_ms=500 only).
+    Polling reads resource timing entries. They don't include in-flight requests,
+    and browser keeps 250 entries by default, so polling may report idle early.
+    '''
+    def __init__(self, idle_ms:int = 500) -> None:
+        self.idle_ms = idle_ms
+    
+    def is_ready(self, driver:webdriver.Chrome) -> bool:
+        script = '''
+        if (document.readyState === 'loading') {
+            return false;
+        }
+        const navigation = performance.getEntriesByType('navigation')[0];
+        let lastResponseEnd = navigation ? navigation.responseEnd : 0;
+        for (const entry of performance.getEntriesByType('resource')) {
+            lastResponseEnd = Math.max(lastResponseEnd, entry.responseEnd);
+        }
+        return arguments[0] <= performance.now() - lastResponseEnd;
+        '''
+        return driver.execute_script(script, self.idle_ms)
+    
+    def is_ready_by_event(self, navigation_state:NavigationState) -> bool | None:
+        # Chrome 'networkIdle' lifecycle event is 500 ms without connections.
+        if self.idle_ms != 500:
+            return None
+        return 'networkIdle' in navigation_state.lifecycle_events
+
+
+class ElementPresent(ReadyCondition):
+    def __init__(self, by:str, value:str) -> None:
+        self.by = by
+        self.value = value
+    
+    def is_ready(self, driver:webdriver.Chrome) -> bool:
+        return 0 < len(driver.find_elements(self.by, self.value))
+
+
+class JavascriptCondition(ReadyCondition):
+    '''
+    expression: javascript expression. ex) "window.__APP_READY__ === true"
+    '''
+    def __init__(self, expression:str) -> None:
+        self.expression = expression
+    
+    def is_ready(self, driver:webdriver.Chrome) -> bool:
+        return bool(driver.execute_script(f"return !!({self.expression});"))
+
+
+class DevtoolsEventThread:
+    '''
+    Thread running trio with CDP connection of driver.\n
+    async_function(connection) runs until cancel(). cancel() works in process, without port.
+    '''
+    def __init__(self, driver:webdriver.Chrome, async_function, name:str = None) -> None:
+        import trio
+        self.__driver = driver
+        self.__async_function = async_function
+        self.__connection = None
+        self.__cancel_scope:trio.CancelScope = None
+        self.__trio_token:trio.lowlevel.TrioToken = None
+        self.__started_event = threading.Event()
+        self.__thread = threading.Thread(target=trio.run, args=(self.__run,), name=name, daemon=True)
+    
+    def start(self, timeout:float = None) -> bool:
+        '''
+        return
+        -
+        (bool): True if connected in timeout
+        '''
+        self.__thread.start()
+        self.__started_event.wait(timeout)
+        return self.is_connected()
+    
+    def is_connected(self) -> bool:
+        return self.__trio_token is not None
+    
+    def run(self, async_function, *args):
+        '''
+        Run async_function(connection, *args) in trio of this thread and return result.
+        '''
+        import trio
+        trio_token = self.__trio_token
+        if trio_token is None:
+            raise RuntimeError("Devtools connection is closed")
+        return trio.from_thread.run(async_function, self.__connection, *args, trio_token=trio_token)
+    
+    def cancel(self):
+        import trio
+        self.__started_event.wait()
+        trio_token = self.__trio_token
+        if trio_token is not None:
+            try:
+                trio.from_thread.run_sync(self.__cancel_scope.cancel, trio_token=trio_token)
+            except trio.RunFinishedError:
+                pass
+        if self.__thread is not threading.current_thread():
+            self.__thread.join()
+    
+    def join(self, timeout:float = None):
+        self.__thread.join(timeout)
+    
+    async def __run(self):
+        import trio
+        try:
+            async with self.__driver.bidi_connection() as connection:
+                with trio.CancelScope() as cancel_scope:
+                    self.__connection = connection
+                    self.__cancel_scope = cancel_scope
+                    self.__trio_token = trio.lowlevel.current_trio_token()
+                    self.__started_event.set()
+                    await self.__async_function(connection)
+        except Exception as e:
+            print(f"Devtools event thread stopped. {type(e).__name__}: {e}")
+        finally:
+            self.__trio_token = None
+            self.__started_event.set()
+
+
+def _cdp_command(method:str, params:dict = None):
+    '''
+    Raw CDP command for CdpSession.execute(), independent of devtools version.
+    '''
+    result = yield {'method': method, 'params': params if params else {}}
+    return result
+
+
+class ResourceBlockProfile:
+    '''
+    resource_types: CDP Network.ResourceType. 'Image', 'Media', 'Font', 'Stylesheet', 'Script', 'XHR', 'Fetch', ...\n
+    url_patterns: patterns of Network.setBlockedURLs. Wildcard '*' is allowed. ex) '*google-analytics.com*'
+    '''
+    def __init__(self, name:str, resource_types:list[str] = None, url_patterns:list[str] = None) -> None:
+        self.name = name
+        self.resource_types = list(resource_types) if resource_types else []
+        self.url_patterns = list(url_patterns) if url_patterns else []
+
+
+class ResourceBlocker:
+    '''
+    Block requests of profiles on live driver by CDP.\n
+    url_patterns: Network.setBlockedURLs. resource_types: Fetch.requestPaused at request stage.\n
+    Saved bytes are estimated by size of same url or average size of same resource type loaded before.
+    '''
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__profiles:list[ResourceBlockProfile] = []
+        self.__url_pattern_regexes:list[tuple[str, re.Pattern]] = []
+        self.__counters:dict[str, dict[str, int]] = {}
+        self.__requests:dict[str, tuple[str, str]] = {}
+        self.__url_sizes:collections.OrderedDict[str, int] = collections.OrderedDict()
+        self.__resource_type_sizes:dict[str, list[int]] = {}
+        self.__listen_thread:DevtoolsEventThread = None
+    
+    def start(self, driver:webdriver.Chrome, timeout:float = 10) -> bool:
+        '''
+        return
+        -
+        (bool): True if devtools connection is connected
+        '''
+        self.__listen_thread = DevtoolsEventThread(driver, self.__listen, name="resource_blocker")
+        if not self.__listen_thread.start(timeout):
+            return False
+        self.set_profiles(self.__profiles)
+        return True
+    
+    def close(self):
+        if self.__listen_thread:
+            self.__listen_thread.cancel()
+            self.__listen_thread = None
+    
+    def set_profiles(self, profiles:list[ResourceBlockProfile]):
+        with self.__lock:
+            self.__profiles = list(profiles)
+            self.__url_pattern_regexes = []
+            for profile in self.__profiles:
+                self.__counters.setdefault(profile.name, {'blocked_request_count': 0, 'estimated_saved_bytes': 0})
+                for url_pattern in profile.url_patterns:
+                    regex = re.compile('.*'.join(re.escape(part) for part in url_pattern.split('*')))
+                    self.__url_pattern_regexes.append((profile.name, regex))
+        if self.__listen_thread:
+            self.__listen_thread.run(self.__apply_profiles)
+    
+    def stats(self) -> dict[str, dict[str, int]]:
+        '''
+        return
+        -
+        (dict[str, dict[str, int]]): {profile name: {'blocked_request_count', 'estimated_saved_bytes'}}
+        '''
+        with self.__lock:
+            return {name: dict(counter) for name, counter in self.__counters.items()}
+    
+    async def __apply_profiles(self, connection):
+        session = connection.session
+        url_patterns = [url_pattern for profile in self.__profiles for url_pattern in profile.url_patterns]
+        resource_types = {resource_type for profile in self.__profiles for resource_type in profile.resource_types}
+        await session.execute(_cdp_command('Network.setBlockedURLs', {'urls': url_patterns}))
+        if resource_types:
+            patterns = [{'resourceType': resource_type, 'requestStage': 'Request'} for resource_type in sorted(resource_types)]
+            await session.execute(_cdp_command('Fetch.enable', {'patterns': patterns}))
+        else:
+            await session.execute(_cdp_command('Fetch.disable'))
+    
+    async def __listen(self, connection):
+        devtools = connection.devtools
+        session = connection.session
+        listener = session.listen(devtools.fetch.RequestPaused,
+                                  devtools.network.RequestWillBeSent,
+                                  devtools.network.LoadingFinished,
+                                  devtools.network.LoadingFailed,
+                                  buffer_size=4096)
+        await session.execute(devtools.network.enable())
+        async for event in listener:
+            if isinstance(event, devtools.fetch.RequestPaused):
+                try:
+                    await session.execute(_cdp_command('Fetch.failRequest', {'requestId': str(event.request_id), 'errorReason': 'BlockedByClient'}))
+                except Exception:
+                    # Request is already finished.
+                    continue
+                self.__count_blocked(self.__find_profile_by_resource_type(event.resource_type.value), event.request.url, event.resource_type.value)
+            elif isinstance(event, devtools.network.RequestWillBeSent):
+                if 10000 <= len(self.__requests):
+                    self.__requests.clear()
+                resource_type = event.type_.value if event.type_ else 'Other'
+                self.__requests[str(event.request_id)] = (event.request.url, resource_type)
+            elif isinstance(event, devtools.network.LoadingFinished):
+                request = self.__requests.pop(str(event.request_id), None)
+                if request:
+                    self.__learn_size(request[0], request[1], int(event.encoded_data_length))
+            elif isinstance(event, devtools.network.LoadingFailed):
+                request = self.__requests.pop(str(event.request_id), None)
+                if request and event.blocked_reason and event.blocked_reason.value == 'inspector':
+                    self.__count_blocked(self.__find_profile_by_url(request[0]), request[0], request[1])
+    
+    def __find_profile_by_resource_type(self, resource_type:str) -> str | None:
+        with self.__lock:
+            for profile in self.__profiles:
+                if resource_type in profile.resource_types:
+                    return profile.name
+        return None
+    
+    def __find_profile_by_url(self, url:str) -> str | None:
+        with self.__lock:
+            for name, regex in self.__url_pattern_regexes:
+                if regex.fullmatch(url):
+                    return name
+        return None
+    
+    def __learn_size(self, url:str, resource_type:str, size:int):
+        with self.__lock:
+            self.__url_sizes[url] = size
+            self.__url_sizes.move_to_end(url)
+            if 4096 < len(self.__url_sizes):
+                self.__url_sizes.popitem(last=False)
+            total_and_count = self.__resource_type_sizes.setdefault(resource_type, [0, 0])
+            total_and_count[0] += size
+            total_and_count[1] += 1
+    
+    def __count_blocked(self, profile_name:str, url:str, resource_type:str):
+        if profile_name is None:
+            return
+        with self.__lock:
+            size = self.__url_sizes.get(url)
+            if size is None:
+                total, count = self.__resource_type_sizes.get(resource_type, (0, 0))
+                size = total // count if count else 0
+            counter = self.__counters[profile_name]
+            counter['blocked_request_count'] += 1
+            counter['estimated_saved_bytes'] += size
+
+
+class WebsocketFrame(NamedTuple):
+    timestamp:float
+    request_id:str
+    opcode:float
+    payload_data:str
+
+
+class WebsocketCapture:
+    '''
+    Websocket frames of a driver in bounded ring buffer, delivered in batch.\n
+    overflow_policy:\n
+    'drop_oldest': drop oldest frame of buffer.\n
+    'drop_newest': drop received frame.\n
+    'block': wait in trio worker thread until buffer has space. Frames received meanwhile wait in listener channel of 4 * buffer_size.
+    If listener channel is also full, selenium drops frames and they are not counted in dropped_count. 'block' reduces loss, not lossless.
+    '''
+    def __init__(self,
+                 buffer_size:int = 65536,
+                 overflow_policy:str = 'drop_oldest',
+                 batch_size:int = 256,
+                 batch_interval:float = 0.1,
+                 batch_function:Callable[[list[WebsocketFrame]], Any] = None,
+                 file_path:str = None) -> None:
+        if overflow_policy not in ('drop_oldest', 'drop_newest', 'block'):
+            raise ValueError(f"Unknown overflow_policy: {overflow_policy}")
+        self.__buffer:collections.deque[WebsocketFrame] = collections.deque()
+        self.__buffer_size = buffer_size
+        self.__overflow_policy = overflow_policy
+        self.__batch_size = batch_size
+        self.__batch_interval = batch_interval
+        self.__batch_function = batch_function
+        self.__file_path = file_path
+        self.__condition = threading.Condition()
+        self.__is_closed = False
+        self.__received_count = 0
+        self.__dropped_count = 0
+        self.__delivered_count = 0
+        self.__written_bytes = 0
+        self.__listen_thread:DevtoolsEventThread = None
+        self.__delivery_thread:threading.Thread = None
+    
+    @property
+    def is_closed(self) -> bool:
+        return self.__is_closed
+    
+    def start(self, driver:webdriver.Chrome, timeout:float = 10) -> bool:
+        '''
+        Start capture on driver. Called again with new driver after browser is changed, buffer is kept.\n
+        return
+        -
+        (bool): True if devtools connection is connected
+        '''
+        if self.__listen_thread:
+            self.__listen_thread.cancel()
+        if (self.__batch_function or self.__file_path) and self.__delivery_thread is None:
+            self.__delivery_thread = threading.Thread(target=self.__deliver, name="websocket_capture_delivery", daemon=True)
+            self.__delivery_thread.start()
+        self.__listen_thread = DevtoolsEventThread(driver, self.__listen, name="websocket_capture")
+        return self.__listen_thread.start(timeout)
+    
+    def close(self):
+        '''
+        Stop capture. Frames in buffer are delivered before return.
+        '''
+        with self.__condition:
+            self.__is_closed = True
+            self.__condition.notify_all()
+        if self.__listen_thread:
+            self.__listen_thread.cancel()
+        if self.__delivery_thread:
+            self.__delivery_thread.join()
+    
+    def get_batch(self, timeout:float = None) -> list[WebsocketFrame]:
+        '''
+        Wait until 'batch_size' frames are buffered or 'batch_interval' seconds after first frame.\n
+        Parameter
+        -
+        timeout (float): seconds to wait first frame. None is infinite.\n
+        return
+        -
+        (list[WebsocketFrame]): empty if timeout or closed
+        '''
+        with self.__condition:
+            if not self.__condition.wait_for(lambda: self.__buffer or self.__is_closed, timeout):
+                return []
+            if not self.__is_closed and len(self.__buffer) < self.__batch_size:
+                self.__condition.wait_for(lambda: self.__batch_size <= len(self.__buffer) or self.__is_closed, self.__batch_interval)
+            count = min(self.__batch_size, len(self.__buffer))
+            batch = [self.__buffer.popleft() for _ in range(count)]
+            self.__delivered_count += count
+            self.__condition.notify_all()
+            return batch
+    
+    def stats(self) -> dict[str, int]:
+        with self.__condition:
+            return {
+                'received_count': self.__received_count,
+                'dropped_count': self.__dropped_count,
+                'delivered_count': self.__delivered_count,
+                'buffered_count': len(self.__buffer),
+                'written_bytes': self.__written_bytes,
+            }
+    
+    def __put(self, frame:WebsocketFrame) -> bool:
+        '''
+        return
+        -
+        (bool): False if buffer is full with 'block' policy. Frame is not put.
+        '''
+        with self.__condition:
+            if self.__is_closed:
+                return True
+            if self.__buffer_size <= len(self.__buffer):
+                if self.__overflow_policy == 'block':
+                    return False
+                self.__received_count += 1
+                self.__dropped_count += 1
+                if self.__overflow_policy == 'drop_newest':
+                    return True
+                self.__buffer.popleft()
+            else:
+                self.__received_count += 1
+            self.__buffer.append(frame)
+            self.__condition.notify_all()
+            return True
+    
+    def __wait_not_full(self):
+        '''
+        Run in worker thread of trio, never in devtools thread.
+        '''
+        with self.__condition:
+            self.__condition.wait_for(lambda: len(self.__buffer) < self.__buffer_size or self.__is_closed)
+    
+    async def __listen(self, connection):
+        import trio
+        network = connection.devtools.network
+        # Drain devtools channel quickly, buffering is done by ring buffer.
+        # 'block' stops draining while buffer is full, so channel holds more frames before selenium drops them.
+        channel_size = self.__buffer_size * 4 if self.__overflow_policy == 'block' else self.__buffer_size
+        listener = connection.session.listen(network.WebSocketFrameReceived, buffer_size=channel_size)
+        await connection.session.execute(network.enable())
+        async for event in listener:
+            frame = WebsocketFrame(float(event.timestamp), str(event.request_id), event.response.opcode, event.response.payload_data)
+            while not self.__put(frame):
+                await trio.to_thread.run_sync(self.__wait_not_full, abandon_on_cancel=True)
+    
+    def __deliver(self):
+        file = open(self.__file_path, 'a') if self.__file_path else None
+        try:
+            while True:
+                batch = self.get_batch()
+                if not batch:
+                    if self.__is_closed:
+                        break
+                    continue
+                if file:
+                    lines = ''.join(json.dumps(frame._asdict()) + '\n' for frame in batch)
+                    file.write(lines)
+                    file.flush()
+                    with self.__condition:
+                        self.__written_bytes += len(lines)
+                if self.__batch_function:
+                    try:
+                        self.__batch_function(batch)
+                    except Exception as e:
+                        print(f"Websocket batch function failed. {type(e).__name__}: {e}")
+        finally:
+            if file:
+                file.close()
+
+
+class NetworkResponse(NamedTuple):
+    timestamp:float
+    request_id:str
+    url:str
+    status:int
+    mime_type:str
+    resource_type:str
+    headers:dict
+    body:bytes
+    is_truncated:bool
+
+
+class _ResponseStream:
+    '''
+    Chunks of streamed response body, kept up to max_body_bytes.
+    '''
+    def __init__(self, max_body_bytes:int) -> None:
+        import trio
+        self.__max_body_bytes = max_body_bytes
+        self.__chunks:list[bytes] = []
+        self.__size = 0
+        self.is_truncated = False
+        self.is_failed = False
+        self.started_event = trio.Event()
+    
+    def add(self, data:bytes, is_first:bool):
+        if self.is_truncated and not is_first:
+            return
+        if is_first:
+            self.__chunks.insert(0, data)
+        else:
+            self.__chunks.append(data)
+        self.__size += len(data)
+        # Drop data over max_body_bytes from tail.
+        while self.__max_body_bytes < self.__size:
+            self.is_truncated = True
+            excess = self.__size - self.__max_body_bytes
+            last = self.__chunks[-1]
+            if len(last) <= excess:
+                self.__chunks.pop()
+                self.__size -= len(last)
+            else:
+                self.__chunks[-1] = last[:len(last) - excess]
+                self.__size -= excess
+    
+    def body(self) -> bytes:
+        return b''.join(self.__chunks)
+
+
+class ResponseCapture:
+    '''
+    Response bodies of XHR/fetch filtered by url pattern and MIME type, delivered by bounded queue.\n
+    Bodies are fetched by Network.getResponseBody after Network.loadingFinished.
+    Body over max_body_bytes is truncated. Devtools keeps bodies up to 2 * max_body_bytes(at least 32MB) in its buffer,
+    larger bodies are evicted by browser and counted as 'evicted_count'.\n
+    If stream_threshold_bytes is set, matched responses of Content-Length over it(or unknown) are streamed by Network.streamResourceContent.
+    Chunks come in Network.dataReceived, and data over max_body_bytes is not kept. Page receives body as usual.\n
+    overflow_policy:\n
+    'drop_newest': drop response if queue is full.\n
+    'block': fetch next body after queue has space. Devtools connection keeps reading other events.
+    '''
+    def __init__(self,
+                 url_patterns:list[str] = None,
+                 mime_types:list[str] = ('application/json',),
+                 resource_types:list[str] = ('XHR', 'Fetch'),
+                 max_body_bytes:int = 10 * 1024 * 1024,
+                 stream_threshold_bytes:int = None,
+                 queue_size:int = 1024,
+                 max_queue_bytes:int = 256 * 1024 * 1024,
+                 overflow_policy:str = 'drop_newest') -> None:
+        if overflow_policy not in ('drop_newest', 'block'):
+            raise ValueError(f"Unknown overflow_policy: {overflow_policy}")
+        self.__url_pattern_regexes = [re.compile('.*'.join(re.escape(part) for part in url_pattern.split('*'))) for url_pattern in (url_patterns or [])]
+        self.__mime_types = list(mime_types) if mime_types else []
+        self.__resource_types = list(resource_types) if resource_types else []
+        self.__max_body_bytes = max_body_bytes
+        self.__resource_buffer_bytes = max(max_body_bytes * 2, 32 * 1024 * 1024)
+        self.__stream_threshold_bytes = stream_threshold_bytes
+        self.__queue_size = queue_size
+        self.__max_queue_bytes = max_queue_bytes
+        self.__overflow_policy = overflow_policy
+        self.__condition = threading.Condition()
+        self.__queue:collections.deque[NetworkResponse] = collections.deque()
+        self.__queue_bytes = 0
+        self.__is_closed = False
+        self.__counters = {'matched_count': 0, 'captured_count': 0, 'streamed_count': 0, 'dropped_count': 0,
+                           'failed_count': 0, 'evicted_count': 0, 'truncated_count': 0, 'body_bytes': 0}
+        # Network request id: (url, status, mime type, resource type, headers)
+        self.__responses:dict[str, tuple] = {}
+        # Network request id: received bytes, to tell eviction from failure
+        self.__data_lengths:dict[str, int] = {}
+        # Network request id: _ResponseStream
+        self.__streams:dict[str, _ResponseStream] = {}
+        self.__listen_thread:DevtoolsEventThread = None
+    
+    @property
+    def is_closed(self) -> bool:
+        return self.__is_closed
+    
+    def start(self, driver:webdriver.Chrome, timeout:float = 10) -> bool:
+        '''
+        Start capture on driver. Called again with new driver after browser is changed, queue is kept.\n
+        return
+        -
+        (bool): True if devtools connection is connected
+        '''
+        if self.__listen_thread:
+            self.__listen_thread.cancel()
+        self.__responses.clear()
+        self.__data_lengths.clear()
+        self.__streams.clear()
+        self.__listen_thread = DevtoolsEventThread(driver, self.__listen, name="response_capture")
+        return self.__listen_thread.start(timeout)
+    
+    def close(self):
+        with self.__condition:
+            self.__is_closed = True
+            self.__condition.notify_all()
+        if self.__listen_thread:
+            self.__listen_thread.cancel()
+            self.__listen_thread = None
+    
+    def get(self, timeout:float = None) -> NetworkResponse | None:
+        '''
+        Parameter
+        -
+        timeout (float): seconds to wait. None is infinite.\n
+        return
+        -
+        (NetworkResponse | None): None if timeout or closed
+        '''
+        with self.__condition:
+            if not self.__condition.wait_for(lambda: self.__queue or self.__is_closed, timeout):
+                return None
+            if not self.__queue:
+                return None
+            response = self.__queue.popleft()
+            self.__queue_bytes -= len(response.body)
+            self.__condition.notify_all()
+            return response
+    
+    def __iter__(self) -> Iterator[NetworkResponse]:
+        '''
+        Responses until close().
+        '''
+        while True:
+            response = self.get()
+            if response is None:
+                return
+            yield response
+    
+    def stats(self) -> dict[str, int]:
+        '''
+        return
+        -
+        (dict[str, int]): 'matched_count', 'captured_count', 'streamed_count', 'dropped_count', 'failed_count', 'evicted_count', 'truncated_count', 'body_bytes', 'queued_count', 'queued_bytes'
+        '''
+        with self.__condition:
+            stats = dict(self.__counters)
+            stats['queued_count'] = len(self.__queue)
+            stats['queued_bytes'] = self.__queue_bytes
+            return stats
+    
+    def __is_match(self, url:str, mime_type:str, resource_type:str) -> bool:
+        if self.__resource_types and resource_type not in self.__resource_types:
+            return False
+        if self.__mime_types and not any(mime_type.startswith(accepted) for accepted in self.__mime_types):
+            return False
+        if self.__url_pattern_regexes and not any(regex.fullmatch(url) for regex in self.__url_pattern_regexes):
+            return False
+        return True
+    
+    def __is_full(self, body_bytes:int) -> bool:
+        return self.__queue_size <= len(self.__queue) or (self.__queue and self.__max_queue_bytes < self.__queue_bytes + body_bytes)
+    
+    def __wait_not_full(self, body_bytes:int):
+        '''
+        Run in worker thread of trio, never in devtools thread.
+        '''
+        with self.__condition:
+            self.__condition.wait_for(lambda: not self.__is_full(body_bytes) or self.__is_closed)
+    
+    async def __put(self, request_id:str, body:bytes, is_truncated:bool = False):
+        import trio
+        response_info = self.__responses.pop(request_id, None)
+        if response_info is None:
+            return
+        url, status, mime_type, resource_type, headers = response_info
+        if self.__max_body_bytes < len(body):
+            body = body[:self.__max_body_bytes]
+            is_truncated = True
+        response = NetworkResponse(time.time(), request_id, url, status, mime_type, resource_type, headers, body, is_truncated)
+        if self.__overflow_policy == 'block':
+            await trio.to_thread.run_sync(self.__wait_not_full, len(body), abandon_on_cancel=True)
+        with self.__condition:
+            if self.__is_closed:
+                return
+            # 'block' appends even if other response took the space while waiting.
+            if self.__overflow_policy == 'drop_newest' and self.__is_full(len(body)):
+                self.__counters['dropped_count'] += 1
+                return
+            self.__queue.append(response)
+            self.__queue_bytes += len(body)
+            self.__counters['captured_count'] += 1
+            self.__counters['body_bytes'] += len(body)
+            if is_truncated:
+                self.__counters['truncated_count'] += 1
+            self.__condition.notify_all()
+    
+    def __count_failed(self, request_id:str, exception:Exception):
+        self.__responses.pop(request_id, None)
+        is_evicted = self.__resource_buffer_bytes < self.__data_lengths.pop(request_id, 0)
+        with self.__condition:
+            self.__counters['evicted_count' if is_evicted else 'failed_count'] += 1
+        if not is_evicted:
+            print(f"Response body capture failed. {type(exception).__name__}: {exception}")
+    
+    def __is_large(self, headers:dict) -> bool:
+        content_length = next((value for name, value in headers.items() if name.lower() == 'content-length'), None)
+        return content_length is None or not str(content_length).isdigit() or self.__stream_threshold_bytes <= int(content_length)
+    
+    async def __listen(self, connection):
+        import trio
+        network = connection.devtools.network
+        session = connection.session
+        listener = session.listen(network.ResponseReceived, network.DataReceived, network.LoadingFinished, network.LoadingFailed, buffer_size=4096)
+        # Keep bodies in browser until they are fetched. Buffer is larger than max_body_bytes, so body over it is truncated, not evicted.
+        await session.execute(_cdp_command('Network.enable', {'maxResourceBufferSize': self.__resource_buffer_bytes,
+                                                              'maxTotalBufferSize': max(self.__resource_buffer_bytes * 4, 100 * 1024 * 1024)}))
+        # 'block' fetches one body at a time, so bodies wait in browser, not in memory.
+        fetch_lock = trio.Lock() if self.__overflow_policy == 'block' else None
+        
+        async with trio.open_nursery() as nursery:
+            async for event in listener:
+                if isinstance(event, network.DataReceived):
+                    request_id = str(event.request_id)
+                    stream = self.__streams.get(request_id)
+                    if stream is not None:
+                        if event.data:
+                            stream.add(base64.b64decode(event.data), False)
+                    elif request_id in self.__data_lengths:
+                        self.__data_lengths[request_id] += event.data_length
+                elif isinstance(event, network.ResponseReceived):
+                    response = event.response
+                    resource_type = event.type_.value
+                    if not self.__is_match(response.url, response.mime_type, resource_type):
+                        continue
+                    request_id = str(event.request_id)
+                    if 10000 <= len(self.__responses):
+                        self.__responses.clear()
+                        self.__data_lengths.clear()
+                        self.__streams.clear()
+                    self.__responses[request_id] = (response.url, response.status, response.mime_type, resource_type, dict(response.headers))
+                    with self.__condition:
+                        self.__counters['matched_count'] += 1
+                    if self.__stream_threshold_bytes and self.__is_large(response.headers):
+                        # Registered before command, so chunks of dataReceived are not missed.
+                        stream = self.__streams[request_id] = _ResponseStream(self.__max_body_bytes)
+                        nursery.start_soon(self.__start_stream, session, request_id, stream)
+                    else:
+                        self.__data_lengths[request_id] = 0
+                elif isinstance(event, network.LoadingFinished):
+                    request_id = str(event.request_id)
+                    stream = self.__streams.pop(request_id, None)
+                    if stream is not None:
+                        nursery.start_soon(self.__finish_stream, session, request_id, stream, fetch_lock)
+                    elif request_id in self.__responses:
+                        nursery.start_soon(self.__get_response_body, session, request_id, fetch_lock)
+                elif isinstance(event, network.LoadingFailed):
+                    request_id = str(event.request_id)
+                    self.__responses.pop(request_id, None)
+                    self.__data_lengths.pop(request_id, None)
+                    self.__streams.pop(request_id, None)
+    
+    async def __start_stream(self, session, request_id:str, stream:_ResponseStream):
+        try:
+            result = await session.execute(_cdp_command('Network.streamResourceContent', {'requestId': request_id}))
+            # Data buffered before streaming is in front of chunks of dataReceived.
+            stream.add(base64.b64decode(result['bufferedData']), True)
+        except Exception:
+            # Loading is finished already, or streaming is not supported. Body is in devtools buffer.
+            stream.is_failed = True
+        stream.started_event.set()
+    
+    async def __finish_stream(self, session, request_id:str, stream:_ResponseStream, fetch_lock):
+        await stream.started_event.wait()
+        if stream.is_failed:
+            self.__data_lengths[request_id] = 0
+            await self.__get_response_body(session, request_id, fetch_lock)
+            return
+        with self.__condition:
+            self.__counters['streamed_count'] += 1
+        await self.__put(request_id, stream.body(), stream.is_truncated)
+    
+    async def __get_response_body(self, session, request_id:str, fetch_lock):
+        async with fetch_lock if fetch_lock else contextlib.nullcontext():
+            if fetch_lock:
+                import trio
+                await trio.to_thread.run_sync(self.__wait_not_full, 0, abandon_on_cancel=True)
+            try:
+                result = await session.execute(_cdp_command('Network.getResponseBody', {'requestId': request_id}))
+            except Exception as e:
+                self.__count_failed(request_id, e)
+                return
+            self.__data_lengths.pop(request_id, None)
+            body = base64.b64decode(result['body']) if result.get('base64Encoded') else result['body'].encode()
+            await self.__put(request_id, body)
+
+
+class ScreenshotWriter:
+    '''
+    Decode base64 images and write files in background threads.\n
+    Pending jobs are bounded by max_pending. submit() waits for space, or returns None if is_block is False.
+    '''
+    def __init__(self, max_pending:int = 32, thread_count:int = 1) -> None:
+        self.__executor = ThreadPoolExecutor(max_workers=thread_count, thread_name_prefix="screenshot_writer")
+        self.__semaphore = threading.BoundedSemaphore(max_pending)
+        self.__lock = threading.Lock()
+        self.__counters = {'written_count': 0, 'written_bytes': 0, 'failed_count': 0, 'dropped_count': 0, 'pending_count': 0}
+    
+    def submit(self, data:str, filename:str = None, function:Callable[[bytes], Any] = None, is_block:bool = True) -> Future | None:
+        '''
+        Parameters
+        -
+        data (str): base64 image\n
+        filename (str): write decoded image to file\n
+        function (Callable[[bytes], Any]): called with decoded image\n
+        Returns
+        -
+        (Future | None): result is True if written. None if dropped.
+        '''
+        if not self.__semaphore.acquire(blocking=is_block):
+            with self.__lock:
+                self.__counters['dropped_count'] += 1
+            return None
+        with self.__lock:
+            self.__counters['pending_count'] += 1
+        try:
+            return self.__executor.submit(self.__write, data, filename, function)
+        except:
+            self.__release()
+            raise
+    
+    def stats(self) -> dict[str, int]:
+        with self.__lock:
+            return dict(self.__counters)
+    
+    def close(self):
+        '''
+        Wait pending jobs.
+        '''
+        self.__executor.shutdown(wait=True)
+    
+    def __write(self, data:str, filename:str, function:Callable[[bytes], Any]) -> bool:
+        try:
+            image = base64.b64decode(data)
+            if filename:
+                directory = os.path.dirname(filename)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(filename, 'wb') as file:
+                    file.write(image)
+            if function:
+                function(image)
+            with self.__lock:
+                self.__counters['written_count'] += 1
+                self.__counters['written_bytes'] += len(image)
+            return True
+        except Exception as e:
+            print(f"Screenshot write failed. {type(e).__name__}: {e}")
+            with self.__lock:
+                self.__counters['failed_count'] += 1
+            return False
+        finally:
+            self.__release()
+    
+    def __release(self):
+        with self.__lock:
+            self.__counters['pending_count'] -= 1
+        self.__semaphore.release()
+
+
+class Screencast:
+    '''
+    Frame stream of Page.startScreencast. Frames are decoded and delivered by ScreenshotWriter.\n
+    Frame is acked as soon as it is received, so browser keeps its frame rate. Frames are dropped if writer is full.
+    '''
+    def __init__(self,
+                 writer:ScreenshotWriter,
+                 format:str = 'jpeg',
+                 quality:int = 80,
+                 max_width:int = None,
+                 max_height:int = None,
+                 every_nth_frame:int = 1,
+                 directory:str = None,
+                 frame_function:Callable[[int, float, bytes], Any] = None) -> None:
+        if format not in ('jpeg', 'png'):
+            raise ValueError(f"Unknown screencast format: {format}")
+        self.__writer = writer
+        self.__params = {'format': format, 'quality': quality, 'everyNthFrame': every_nth_frame}
+        if max_width:
+            self.__params['maxWidth'] = max_width
+        if max_height:
+            self.__params['maxHeight'] = max_height
+        self.__directory = directory
+        self.__frame_function = frame_function
+        self.__extension = 'jpg' if format == 'jpeg' else 'png'
+        self.__lock = threading.Lock()
+        self.__received_count = 0
+        self.__dropped_count = 0
+        self.__is_closed = False
+        self.__listen_thread:DevtoolsEventThread = None
+    
+    @property
+    def is_closed(self) -> bool:
+        return self.__is_closed
+    
+    def start(self, driver:webdriver.Chrome, timeout:float = 10) -> bool:
+        '''
+        Start screencast on driver. Called again with new driver after browser is changed, frame index continues.\n
+        return
+        -
+        (bool): True if devtools connection is connected
+        '''
+        if self.__listen_thread:
+            self.__listen_thread.cancel()
+        if self.__directory:
+            os.makedirs(self.__directory, exist_ok=True)
+        self.__listen_thread = DevtoolsEventThread(driver, self.__listen, name="screencast")
+        return self.__listen_thread.start(timeout)
+    
+    def close(self):
+        self.__is_closed = True
+        if self.__listen_thread:
+            try:
+                self.__listen_thread.run(self.__stop)
+            except Exception:
+                pass
+            self.__listen_thread.cancel()
+            self.__listen_thread = None
+    
+    def stats(self) -> dict[str, int]:
+        with self.__lock:
+            return {'received_count': self.__received_count, 'dropped_count': self.__dropped_count}
+    
+    async def __stop(self, connection):
+        await connection.session.execute(_cdp_command('Page.stopScreencast'))
+    
+    async def __listen(self, connection):
+        devtools = connection.devtools
+        session = connection.session
+        listener = session.listen(devtools.page.ScreencastFrame, buffer_size=16)
+        await session.execute(_cdp_command('Page.startScreencast', self.__params))
+        async for event in listener:
+            await session.execute(_cdp_command('Page.screencastFrameAck', {'sessionId': event.session_id}))
+            with self.__lock:
+                index = self.__received_count
+                self.__received_count += 1
+            timestamp = float(event.metadata.timestamp) if event.metadata.timestamp is not None else time.time()
+            filename = os.path.join(self.__directory, f"{index:08d}.{self.__extension}") if self.__directory else None
+            function = functools.partial(self.__frame_function, index, timestamp) if self.__frame_function else None
+            if self.__writer.submit(event.data, filename, function, is_block=False) is None:
+                with self.__lock:
+                    self.__dropped_count += 1
+
+
+class ScreenshotAsyncResult(ReadAsyncResult):
+    def get(self) -> bytes:
+        return base64.b64decode(super().get())
+
+
+class ScreenshotFileAsyncResult(ReadAsyncResult):
+    def get(self) -> bool:
+        '''
+        Wait until file is written.
+        '''
+        future:Future = super().get()
+        return future.result()
+
+
+@functools.lru_cache(None)
+def _element_tree_html_parser_class() -> type:
+    '''
+    html.parser and ElementTree are imported when first snapshot is parsed without lxml.
+    '''
+    import html.parser
+    import xml.etree.ElementTree as ElementTree
+    
+    class _ElementTreeHtmlParser(html.parser.HTMLParser):
+        '''
+        HTML to ElementTree, used if lxml is not installed. Unclosed tags are closed by parent end tag.
+        '''
+        void_tags = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr'}
+    
+        def __init__(self) -> None:
+            super().__init__(convert_charrefs=True)
+            self.document = ElementTree.Element('document')
+            self.__stack = [self.document]
+    
+        def handle_starttag(self, tag:str, attrs:list[tuple[str, str]]):
+            element = ElementTree.SubElement(self.__stack[-1], tag, {name: value or '' for name, value in attrs})
+            if tag not in self.void_tags:
+                self.__stack.append(element)
+    
+        def handle_startendtag(self, tag:str, attrs:list[tuple[str, str]]):
+            ElementTree.SubElement(self.__stack[-1], tag, {name: value or '' for name, value in attrs})
+    
+        def handle_endtag(self, tag:str):
+            for index in range(len(self.__stack) - 1, 0, -1):
+                if self.__stack[index].tag == tag:
+                    del self.__stack[index:]
+                    return
+    
+        def handle_data(self, data:str):
+            parent = self.__stack[-1]
+            if len(parent):
+                parent[-1].tail = (parent[-1].tail or '') + data
+            else:
+                parent.text = (parent.text or '') + data
+    
+    return _ElementTreeHtmlParser
+
+
+_CSS_COMPOUND_PATTERN = re.compile(r'(?P<tag>[a-zA-Z][\w-]*|\*)?(?P<rest>(?:[#.][\w-]+|\[[^\]]+\])*)$')
+_CSS_SIMPLE_PATTERN = re.compile(r'([#.])([\w-]+)|\[\s*([\w-]+)\s*(?:=\s*["\']?([^"\'\]]*)["\']?\s*)?\]')
+
+
+class SnapshotElement:
+    '''
+    Element of DomSnapshot. tag, attributes and text are read in process.
+    '''
+    def __init__(self, element, snapshot:'DomSnapshot') -> None:
+        self.__element = element
+        self.__snapshot = snapshot
+    
+    @property
+    def tag(self) -> str:
+        return self.__element.tag
+    
+    @property
+    def attributes(self) -> dict[str, str]:
+        return dict(self.__element.attrib)
+    
+    @property
+    def text(self) -> str:
+        '''
+        Text content of element and descendants.
+        '''
+        return ''.join(self.__element.itertext())
+    
+    def get_attribute(self, name:str) -> str | None:
+        return self.__element.get(name)
+    
+    def xpath(self, expression:str) -> list['SnapshotElement | str']:
+        '''
+        Query from this element. Full XPath 1.0 if lxml is installed, otherwise ElementTree XPath subset.
+        '''
+        return self.__snapshot._xpath(self.__element, expression)
+    
+    def css(self, selector:str) -> list['SnapshotElement']:
+        '''
+        Query descendants. Full CSS if lxml and cssselect are installed, otherwise tag, #id, .class, [attribute], [attribute=value] with ' ' and '>' combinators.
+        '''
+        return self.__snapshot._css(self.__element, selector)
+    
+    def __repr__(self) -> str:
+        return f"<SnapshotElement {self.tag} {self.attributes}>"
+
+
+class DomSnapshot:
+    '''
+    Parsed DOM of page at capture. Queries run in process without browser.\n
+    lxml is used if installed, otherwise html.parser and ElementTree.
+    '''
+    def __init__(self, html_text:str, url:str) -> None:
+        self.html = html_text
+        self.url = url
+        self.captured_time = time.time()
+        try:
+            import lxml.html
+            self.__is_lxml = True
+            self.__root = lxml.html.document_fromstring(html_text) if html_text.strip() else lxml.html.Element('html')
+            self.__parents = None
+        except ImportError:
+            self.__is_lxml = False
+            parser = _element_tree_html_parser_class()()
+            parser.feed(html_text)
+            parser.close()
+            html_elements = [element for element in parser.document if element.tag == 'html']
+            self.__root = html_elements[0] if len(parser.document) == 1 and html_elements else parser.document
+            self.__parents = {child: parent for parent in self.__root.iter() for child in parent}
+    
+    @property
+    def root(self) -> SnapshotElement:
+        return SnapshotElement(self.__root, self)
+    
+    def xpath(self, expression:str) -> list[SnapshotElement | str]:
+        '''
+        ex) snapshot.xpath('//table//tr/td[1]')
+        '''
+        return self._xpath(self.__root, expression)
+    
+    def css(self, selector:str) -> list[SnapshotElement]:
+        '''
+        ex) snapshot.css('table tr > td.name')
+        '''
+        return self._css(self.__root, selector)
+    
+    def find_xpath(self, expression:str) -> SnapshotElement | str | None:
+        found = self.xpath(expression)
+        return found[0] if found else None
+    
+    def find_css(self, selector:str) -> SnapshotElement | None:
+        found = self.css(selector)
+        return found[0] if found else None
+    
+    def _xpath(self, element, expression:str) -> list[SnapshotElement | str]:
+        if self.__is_lxml:
+            import lxml.etree
+            try:
+                found = element.xpath(expression)
+            except lxml.etree.XPathError as e:
+                raise InvalidSelectorException(f"Invalid xpath: {expression} {e}")
+            if not isinstance(found, list):
+                return [found]
+            return [SnapshotElement(item, self) if isinstance(item, lxml.etree._Element) else str(item) for item in found]
+        
+        # ElementTree paths are relative. '/html/body' -> './body' from root html.
+        path = expression
+        if path.startswith('//'):
+            path = '.' + path
+        elif path.startswith('/'):
+            if element is self.__root and path.startswith('/' + self.__root.tag):
+                path = '.' + path[len(self.__root.tag) + 1:]
+            else:
+                path = '.' + path
+        try:
+            return [SnapshotElement(item, self) for item in element.findall(path)]
+        except (SyntaxError, KeyError) as e:
+            raise InvalidSelectorException(f"Xpath is not supported without lxml: {expression} {e}")
+    
+    def _css(self, element, selector:str) -> list[SnapshotElement]:
+        if self.__is_lxml:
+            try:
+                import cssselect
+                try:
+                    return [SnapshotElement(item, self) for item in element.cssselect(selector)]
+                except cssselect.SelectorError as e:
+                    raise InvalidSelectorException(f"Invalid css selector: {selector} {e}")
+            except ImportError:
+                pass
+        
+        groups = [self.__parse_css(group) for group in selector.split(',')]
+        found = []
+        for item in element.iter():
+            if item is element or not isinstance(item.tag, str):
+                continue
+            if any(self.__match_css(item, compounds, combinators, len(compounds) - 1) for compounds, combinators in groups):
+                found.append(SnapshotElement(item, self))
+        return found
+    
+    def __parse_css(self, selector:str) -> tuple[list, list]:
+        compounds = []
+        combinators = [None]
+        tokens = re.split(r'\s*(>)\s*|\s+', selector.strip())
+        for index, token in enumerate(tokens):
+            if index % 2:
+                combinators.append(token or ' ')
+                continue
+            match = _CSS_COMPOUND_PATTERN.match(token or '')
+            if not token or not match:
+                raise InvalidSelectorException(f"Css selector is not supported without cssselect: {selector}")
+            tag = match.group('tag')
+            simples = []
+            for simple in _CSS_SIMPLE_PATTERN.finditer(match.group('rest')):
+                simples.append(simple.groups())
+            compounds.append((None if tag in (None, '*') else tag.lower(), simples))
+        return compounds, combinators
+    
+    def __match_compound(self, element, compound:tuple) -> bool:
+        tag, simples = compound
+        if tag and element.tag != tag:
+            return False
+        for prefix, name, attribute, value in simples:
+            if prefix == '#':
+                if element.get('id') != name:
+                    return False
+            elif prefix == '.':
+                if name not in (element.get('class') or '').split():
+                    return False
+            elif element.get(attribute) is None or (value is not None and element.get(attribute) != value):
+                return False
+        return True
+    
+    def __get_parent(self, element):
+        if self.__is_lxml:
+            return element.getparent()
+        return self.__parents.get(element)
+    
+    def __match_css(self, element, compounds:list, combinators:list, index:int) -> bool:
+        if not self.__match_compound(element, compounds[index]):
+            return False
+        if index == 0:
+            return True
+        parent = self.__get_parent(element)
+        if combinators[index] == '>':
+            return parent is not None and self.__match_css(parent, compounds, combinators, index - 1)
+        while parent is not None:
+            if self.__match_css(parent, compounds, combinators, index - 1):
+                return True
+            parent = self.__get_parent(parent)
+        return False
+
+
+class DomSnapshotAsyncResult(ReadAsyncResult):
+    def get(self) -> DomSnapshot:
+        return super().get()
+
+
+class ElementCache:
+    '''
+    LRU cache of found WebElements by locator, scoped to document.\n
+    Entry of other scope is a miss. clear() on navigation.
+    '''
+    def __init__(self, max_size:int) -> None:
+        self.__max_size = max_size
+        self.__lock = threading.Lock()
+        self.__entries:collections.OrderedDict[tuple, WebElement | list[WebElement]] = collections.OrderedDict()
+        self.__counters = {'hit_count': 0, 'miss_count': 0, 'stale_count': 0, 'eviction_count': 0}
+    
+    def get(self, scope:tuple, locator:tuple) -> WebElement | list[WebElement] | None:
+        with self.__lock:
+            found = self.__entries.get((scope, locator))
+            if found is None:
+                self.__counters['miss_count'] += 1
+                return None
+            self.__entries.move_to_end((scope, locator))
+            self.__counters['hit_count'] += 1
+            return found
+    
+    def put(self, scope:tuple, locator:tuple, found:WebElement | list[WebElement]):
+        with self.__lock:
+            self.__entries[(scope, locator)] = found
+            self.__entries.move_to_end((scope, locator))
+            while self.__max_size < len(self.__entries):
+                self.__entries.popitem(last=False)
+                self.__counters['eviction_count'] += 1
+    
+    def invalidate(self, scope:tuple, locator:tuple):
+        '''
+        Remove stale entry. Counted as stale instead of hit.
+        '''
+        with self.__lock:
+            if self.__entries.pop((scope, locator), None) is not None:
+                self.__counters['hit_count'] -= 1
+                self.__counters['miss_count'] += 1
+                self.__counters['stale_count'] += 1
+    
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+    
+    def stats(self) -> dict[str, int]:
+        with self.__lock:
+            stats = dict(self.__counters)
+            stats['size'] = len(self.__entries)
+            return stats
+
+
+class TabWorker:
+    '''
+    Tab of browser driven by its own CDP session, without switch_to.window.\n
+    Navigation queue(1 thread) and read thread pool with same ordering as ChromeWebdriver:
+    reads run after navigation issued before them, and navigation waits reads issued before it.\n
+    Reads return values by javascript, not WebElement.
+    '''
+    def __init__(self, devtools_thread:DevtoolsEventThread, root_connection, session, target_id:str, read_thread_count:int) -> None:
+        self.target_id = target_id
+        self.__devtools_thread = devtools_thread
+        self.__root_connection = root_connection
+        self.__session = session
+        from multiprocessing.pool import ThreadPool
+        self.__tab_thread = ThreadPool(1)
+        self.__read_executor = ReadExecutor(read_thread_count, 1, name="tab_read")
+        self.__epoch_condition = threading.Condition()
+        self.__issued_epoch = 0
+        self.__committed_epoch = 0
+        self.__epoch_read_counts:dict[int, int] = {}
+        self.__deferred_reads:list[tuple[int, ReadFuture, Callable, tuple]] = []
+        self.__read_context = threading.local()
+        self.__is_closed = False
+    
+    def close(self):
+        if self.__is_closed:
+            return
+        self.__is_closed = True
+        self.__read_executor.close()
+        self.__read_executor.join()
+        self.__tab_thread.close()
+        self.__tab_thread.join()
+        try:
+            self.__run(10, self.__close_target)
+        except Exception:
+            # Browser is closed.
+            pass
+    
+    def open_async(self, timeout:float, url:str, wait_until:str = 'load') -> BoolAsyncResult:
+        '''
+        Parameters
+        -
+        timeout (float): timeout seconds\n
+        url (str): url\n
+        wait_until (str): lifecycle event. 'commit', 'DOMContentLoaded', 'load', 'networkAlmostIdle' or 'networkIdle'\n
+        Returns
+        -
+        (BoolAsyncResult) : BoolAsyncResult.get() return True if wait_until event is fired in timeout
+        '''
+        with self.__epoch_condition:
+            self.__issued_epoch += 1
+            epoch = self.__issued_epoch
+        return BoolAsyncResult(self.__tab_thread.apply_async(self.__navigate, args=(epoch, timeout, url, wait_until)))
+    
+    def open(self, timeout:float, url:str, wait_until:str = 'load') -> bool:
+        return self.open_async(timeout, url, wait_until).get()
+    
+    def evaluate_async(self, timeout:float, expression:str) -> ReadAsyncResult:
+        '''
+        Evaluate javascript expression in tab. Promise is awaited.\n
+        Returns
+        -
+        (ReadAsyncResult) : ReadAsyncResult.get() return json value of result
+        '''
+        return ReadAsyncResult(self.__apply_read_async(self.__evaluate, timeout, expression))
+    
+    def evaluate(self, timeout:float, expression:str) -> Any:
+        return self.evaluate_async(timeout, expression).get()
+    
+    def get_element_value_async(self, timeout:float, by:str, value:str, property_name:str = 'textContent') -> ReadAsyncResult:
+        '''
+        Wait element by MutationObserver and return its property.\n
+        Returns
+        -
+        (ReadAsyncResult) : ReadAsyncResult.get() return element[property_name]. Raise TimeoutException if not found.
+        '''
+        return ReadAsyncResult(self.__apply_read_async(self.__get_element_value, timeout, by, value, property_name))
+    
+    def get_element_value(self, timeout:float, by:str, value:str, property_name:str = 'textContent') -> Any:
+        return self.get_element_value_async(timeout, by, value, property_name).get()
+    
+    def get_elements_batch_async(self, timeout:float, locators:dict[str, tuple]) -> ElementsAsyncResult:
+        '''
+        Parameters
+        -
+        locators (dict[str, tuple]): {name: (By, locator)} or {name: (By, locator, property_name)}. default property_name: 'textContent'\n
+        Returns
+        -
+        (ElementsAsyncResult) : ElementsAsyncResult.get() return {name: value of property}
+        '''
+        return ElementsAsyncResult(self.__apply_read_async(self.__get_elements_batch, timeout, locators))
+    
+    def get_elements_batch(self, timeout:float, locators:dict[str, tuple]) -> dict[str, Any]:
+        return self.get_elements_batch_async(timeout, locators).get()
+    
+    def snapshot_async(self, timeout:float = 30) -> DomSnapshotAsyncResult:
+        return DomSnapshotAsyncResult(self.__apply_read_async(self.__snapshot, timeout))
+    
+    def snapshot(self, timeout:float = 30) -> DomSnapshot:
+        return self.snapshot_async(timeout).get()
+    
+    def memory_usage(self, timeout:float = 10) -> dict[str, int]:
+        '''
+        return
+        -
+        (dict[str, int]): 'used_heap_bytes', 'total_heap_bytes' of javascript heap of tab
+        '''
+        heap_usage = self.__run(timeout, self.__execute, 'Runtime.getHeapUsage', {})
+        return {'used_heap_bytes': int(heap_usage['usedSize']), 'total_heap_bytes': int(heap_usage['totalSize'])}
+    
+    # Navigation Epoch
+    def __navigate(self, epoch:int, timeout:float, url:str, wait_until:str) -> bool:
+        with self.__epoch_condition:
+            self.__epoch_condition.wait_for(lambda: all(epoch <= e for e in self.__epoch_read_counts))
+        try:
+            return self.__run(timeout, self.__navigate_cdp, url, wait_until)
+        except TimeoutException:
+            return False
+        finally:
+            with self.__epoch_condition:
+                self.__committed_epoch = epoch
+                deferred_reads = []
+                for read_epoch, future, function, args in self.__deferred_reads:
+                    if read_epoch <= epoch:
+                        self.__submit_read(future, function, args)
+                    else:
+                        deferred_reads.append((read_epoch, future, function, args))
+                self.__deferred_reads = deferred_reads
+                self.__epoch_condition.notify_all()
+    
+    def __apply_read_async(self, function:Callable, *args) -> ReadFuture:
+        future = ReadFuture()
+        with self.__epoch_condition:
+            epoch = self.__issued_epoch
+            self.__epoch_read_counts[epoch] = self.__epoch_read_counts.get(epoch, 0) + 1
+            future.add_done_callback(lambda _: self.__finish_read(epoch))
+            if epoch <= self.__committed_epoch:
+                self.__submit_read(future, function, args)
+            else:
+                self.__deferred_reads.append((epoch, future, function, args))
+        return future
+    
+    def __submit_read(self, future:ReadFuture, function:Callable, args:tuple):
+        try:
+            self.__read_executor.submit(future, self.__run_read, future, function, args)
+        except ValueError as e:
+            future._finish(exception=e)
+    
+    def __run_read(self, future:ReadFuture, function:Callable, args:tuple) -> Any:
+        self.__read_context.future = future
+        try:
+            return function(*args)
+        finally:
+            self.__read_context.future = None
+    
+    def __finish_read(self, epoch:int):
+        with self.__epoch_condition:
+            self.__epoch_read_counts[epoch] -= 1
+            if self.__epoch_read_counts[epoch] == 0:
+                del self.__epoch_read_counts[epoch]
+                self.__epoch_condition.notify_all()
+    
+    # CDP
+    def __run(self, timeout:float, async_function, *args) -> Any:
+        '''
+        Run async_function(connection, *args) in devtools thread with timeout.
+        '''
+        import trio
+        async def run_with_timeout(connection):
+            with trio.move_on_after(timeout) as cancel_scope:
+                return await async_function(connection, *args)
+            if cancel_scope.cancelled_caught:
+                raise TimeoutException(f"Tab {self.target_id} timeout {timeout} seconds")
+        return self.__devtools_thread.run(run_with_timeout)
+    
+    async def __execute(self, connection, method:str, params:dict) -> dict:
+        return await self.__session.execute(_cdp_command(method, params))
+    
+    async def __close_target(self, connection):
+        await self.__root_connection.execute(_cdp_command('Target.closeTarget', {'targetId': self.target_id}))
+    
+    async def __navigate_cdp(self, connection, url:str, wait_until:str) -> bool:
+        listener = self.__session.listen(connection.devtools.page.LifecycleEvent, buffer_size=64)
+        async with listener:
+            result = await self.__session.execute(_cdp_command('Page.navigate', {'url': url}))
+            if result.get('errorText'):
+                print(f"Tab navigation failed. {url} {result['errorText']}")
+                return False
+            loader_id = result.get('loaderId')
+            if wait_until == 'commit' or loader_id is None:
+                # Same document navigation has no loader.
+                return True
+            async for event in listener:
+                if event.loader_id == loader_id and event.name == wait_until:
+                    return True
+        return False
+    
+    def __evaluate(self, timeout:float, expression:str) -> Any:
+        params = {'expression': expression, 'returnByValue': True, 'awaitPromise': True}
+        result = self.__run(timeout, self.__execute, 'Runtime.evaluate', params)
+        exception_details = result.get('exceptionDetails')
+        if exception_details:
+            description = exception_details.get('exception', {}).get('description') or exception_details.get('text')
+            raise WebDriverException(f"Javascript error: {description}")
+        return result['result'].get('value')
+    
+    def __get_element_value(self, timeout:float, by:str, value:str, property_name:str) -> Any:
+        arguments = json.dumps([by, value, False, int(timeout * 1000)])
+        expression = f"""new Promise(resolve => (function () {{ {_WAIT_ELEMENTS_SCRIPT} }}).apply(null,
+            {arguments}.concat([found => resolve(found === null ? {{found: false}} : {{found: true, value: found[{json.dumps(property_name)}]}})])))"""
+        result = self.__evaluate(timeout + 5, expression)
+        if not result['found']:
+            raise TimeoutException(f"Not found element. by:{by} value:{value}")
+        return result.get('value')
+    
+    def __get_elements_batch(self, timeout:float, locators:dict[str, tuple]) -> dict[str, Any]:
+        pending_locators = {}
+        for name, locator in locators.items():
+            property_name = locator[2] if 2 < len(locator) else 'textContent'
+            pending_locators[name] = [name, locator[0], locator[1], property_name, False]
+        
+        found_values = {}
+        end_time = time.monotonic() + timeout
+        while True:
+            expression = f"(function () {{ {_FIND_ELEMENTS_BATCH_SCRIPT} }}).apply(null, [{json.dumps(list(pending_locators.values()))}])"
+            found, errors = self.__evaluate(max(1, end_time - time.monotonic()), expression)
+            if errors:
+                raise InvalidSelectorException(f"Invalid locators: {errors}")
+            for name, found_value in found.items():
+                found_values[name] = found_value
+                pending_locators.pop(name, None)
+            
+            if not pending_locators:
+                return {name: found_values[name] for name in locators}
+            
+            if end_time < time.monotonic():
+                raise TimeoutException(f"Not found locators: {list(pending_locators)}")
+            time.sleep(POLL_FREQUENCY)
+            self.__read_context.future.check()
     
-    def get(self) -> bool:
-        return self.__ar.get()
+    def __snapshot(self, timeout:float) -> DomSnapshot:
+        url, html_text = self.__evaluate(timeout, "[location.href, document.documentElement ? document.documentElement.outerHTML : '']")
+        return DomSnapshot(html_text, url)
+
+
+class RecyclePolicy:
+    '''
+    Restart browser on same profile when a threshold is exceeded.
+    It is checked in browser thread before navigation of open_async()/open(), after reads of previous navigation are finished.\n
+    max_navigation_count: navigations since browser started\n
+    max_js_heap_bytes: JSHeapUsedSize of CDP Performance.getMetrics\n
+    max_rss_bytes: RSS of chromedriver and browser process tree\n
+    check_interval: seconds between checks of heap and RSS\n
+    callback: callback(reason:str, values:dict) after restart. reason is 'navigation_count', 'js_heap_bytes' or 'rss_bytes'
+    '''
+    def __init__(self,
+                 max_navigation_count:int = None,
+                 max_js_heap_bytes:int = None,
+                 max_rss_bytes:int = None,
+                 check_interval:float = 10,
+                 callback:Callable[[str, dict], Any] = None) -> None:
+        self.max_navigation_count = max_navigation_count
+        self.max_js_heap_bytes = max_js_heap_bytes
+        self.max_rss_bytes = max_rss_bytes
+        self.check_interval = check_interval
+        self.callback = callback
+
 
 class ChromeWebdriver():
     def __init__(self) -> None:
@@ -38,9 +2189,66 @@ class ChromeWebdriver():
         self.driver_version_separator = 'd'
         self.browser_version_separator = 'b'
         self.default_downloaded_driver_name = "chromedriver"
-        self.__websocket_listen_thread:threading.Thread = None
+        self.default_driver_metadata_base_url = "https://googlechromelabs.github.io/chrome-for-testing"
+        self.__driver_manifest:dict = None
+        self.__websocket_listen_thread:DevtoolsEventThread = None
+        self.__websocket_listening_function = None
+        self.__websocket_captures:list[WebsocketCapture] = []
+        self.__response_captures:list[ResponseCapture] = []
+        self.__resource_blocker:ResourceBlocker = None
+        self.__metrics = Metrics()
+        self.__last_cpu_sample:tuple[float, float] = None
+        # Seconds of startup phases: {'import', 'path_setup', 'version_detection', 'driver_resolution', 'browser_launch'}
+        self.__startup_phases:dict[str, float] = {}
+        # DOM snapshot of current navigation: (key, DomSnapshot)
+        self.__snapshot_lock = threading.Lock()
+        self.__snapshot_cache:tuple[tuple, DomSnapshot] = None
+        self.__screenshot_writer:ScreenshotWriter = None
+        self.__screencasts:list[Screencast] = []
+        self.__element_cache:ElementCache = None
+        self.__is_element_cache_check_connected = True
+        # Tab workers share one browser level CDP connection.
+        self.__tab_workers:list[TabWorker] = []
+        self.__tab_devtools_thread:DevtoolsEventThread = None
+        self.__tab_root_connection = None
+        self.__tab_connected_event = threading.Event()
+        self.__recycle_policy:RecyclePolicy = None
+        self.__recycle_navigation_count = 0
+        self.__recycle_checked_time = 0.0
+        
+        # Hot standby: pre-launched driver on other profile slot('{profile_name}.standby').
+        self.__is_hot_standby = False
+        self.__is_closing = False
+        self.__active_profile_slot = 0
+        self.__driver_config:tuple = None
+        self.__standby_lock = threading.Lock()
+        self.__standby_driver:webdriver.Chrome = None
+        self.__standby_config:tuple = None
+        self.__standby_profile_slot = 1
+        self.__standby_thread:threading.Thread = None
         self.__driver:webdriver.Chrome = None
+        self.__navigation_state = NavigationState()
+        self.__navigation_listener:DevtoolsEventThread = None
+        self.__wait_strategy = 'event'
+        self.__page_load_strategy = 'normal'
+        self.__started_navigation_count = 0
+        self.__started_within_document_navigation_count = 0
+        # performance.timeOrigin of document before navigation, to tell new document in polling. None if not needed.
+        self.__previous_time_origin:float = None
+        
+        # Navigation epoch: every navigation starts new epoch and read tasks are bound to epoch when issued.
+        self.__epoch_condition = threading.Condition()
+        self.__issued_epoch = 0
+        self.__started_epoch = 0
+        self.__committed_epoch = 0
+        self.__epoch_read_counts:dict[int, int] = {}
+        # Reads issued before their navigation is committed, submitted on commit: (epoch, future, args of __run_read)
+        self.__deferred_reads:list[tuple[int, ReadFuture, tuple]] = []
+        self.__read_context = threading.local()
+        self.__read_options = threading.local()
+        self.__read_executor:ReadExecutor = None
         
+    @_measure
     def initialize(self, 
                 is_headless:bool,
                 data_dir_name:str = "chrome_data",
@@ -53,17 +2261,63 @@ class ChromeWebdriver():
                 window_height:int= 600, 
                 is_enable_image:bool= True, 
                 user_agent:str= None,
-                websocket_listening_function= None):
-        
+                websocket_listening_function= None,
+                base_dir:str= None,
+                driver_metadata_base_url:str= None,
+                driver_metadata_ttl:float= 86400,
+                wait_strategy:str= 'event',
+                page_load_strategy:str= 'normal',
+                profile_template_name:str= None,
+                is_hot_standby:bool= False,
+                element_cache_size:int= 0,
+                is_element_cache_check_connected:bool= True,
+                recycle_policy:RecyclePolicy= None,
+                min_read_thread_count:int= 1):
+        '''
+        Parameters
+        -
+        base_dir (str): directory of 'data_dir_name'. default: directory of caller file\n
+        driver_metadata_base_url (str): mirror of 'https://googlechromelabs.github.io/chrome-for-testing'\n
+        driver_metadata_ttl (float): seconds to use cached driver download metadata without revalidation\n
+        wait_strategy (str): 'event' or 'poll'\n
+        'event': wait element by MutationObserver and url by CDP events. Fallback to 'poll' if failed.\n
+        'poll': WebDriverWait polling every 0.5 seconds.\n
+        page_load_strategy (str): 'normal', 'eager' or 'none'. driver.get() waits 'load', 'DOMContentLoaded' or nothing.\n
+        profile_template_name (str): new profile is cloned from template created by create_profile_template()\n
+        is_hot_standby (bool): keep one pre-launched browser on profile '{profile_name}.standby'.
+        reset_driver() and crash recovery swap it in, and start new standby in background.\n
+        element_cache_size (int): cache found element of get_element_*() by locator in current document. get_elements_*() is not cached. 0 disables.\n
+        is_element_cache_check_connected (bool): check cached elements are connected to document before use.
+        False skips a script call per hit, but stale element can be returned after DOM is changed.\n
+        recycle_policy (RecyclePolicy): restart browser when navigation count, javascript heap or RSS exceeds threshold.\n
+        min_read_thread_count (int): read threads grow up to 'read_thread_count' while reads are waiting, and shrink to it when idle.
+        '''
         uname = platform.uname()
         if uname.system == "Windows":
             raise RuntimeError("Not implement windows")
         
-        frames = inspect.stack()
-        caller_frame = frames[1]
+        if wait_strategy not in ('event', 'poll'):
+            raise ValueError(f"Unknown wait_strategy: {wait_strategy}")
+        self.__wait_strategy = wait_strategy
+        
+        if page_load_strategy not in ('normal', 'eager', 'none'):
+            raise ValueError(f"Unknown page_load_strategy: {page_load_strategy}")
+        self.__page_load_strategy = page_load_strategy
+        self.__profile_template_name = profile_template_name
+        self.__is_hot_standby = is_hot_standby
+        self.__element_cache = ElementCache(element_cache_size) if 0 < element_cache_size else None
+        self.__is_element_cache_check_connected = is_element_cache_check_connected
+        self.__recycle_policy = recycle_policy
+        self.__is_closing = False
+        self.__active_profile_slot = 0
+        self.__startup_phases = {'import': _IMPORT_SECONDS}
+        path_setup_start_time = time.perf_counter()
         
-        caller_filename = caller_frame.filename
-        self.__running_path = '/'.join(caller_filename.split('/')[:-1])
+        if base_dir:
+            self.__running_path = base_dir
+        else:
+            # 1 is wrapper of _measure
+            self.__running_path = _caller_directory(2)
         
         self.__data_dir_name = data_dir_name
         self.__profile_name = profile_name
@@ -74,6 +2328,8 @@ class ChromeWebdriver():
         self.__window_height = window_height
         self.__is_enable_image = is_enable_image
         self.__user_agent = user_agent
+        self.__driver_metadata_base_url = driver_metadata_base_url if driver_metadata_base_url else self.default_driver_metadata_base_url
+        self.__driver_metadata_ttl = driver_metadata_ttl
         
         data_path = self.__get_data_path()
         if not os.path.exists(data_path):
@@ -87,16 +2343,26 @@ class ChromeWebdriver():
         if not os.path.exists(profiles_path):
             os.mkdir(profiles_path)
         
+        # Remove trash of previous process.
+        for trash_parent_path in (profiles_path, self.__get_profile_templates_path()):
+            if not os.path.exists(trash_parent_path):
+                continue
+            for file_name in os.listdir(trash_parent_path):
+                if file_name.startswith('.trash-'):
+                    self.__remove_directory_background(f"{trash_parent_path}/{file_name}")
+        
         profile_path = self.__get_profile_path()
-        if os.path.exists(profile_path):
-            if is_remove_profile_when_start:
-                self.__remove_directory(profile_path)
-                os.mkdir(profile_path)
-        else:
-            os.mkdir(profile_path)
+        if os.path.exists(profile_path) and is_remove_profile_when_start:
+            self.__remove_directory_background(profile_path)
+        
+        self.__prepare_profile_directory(profile_path)
+        self.__startup_phases['path_setup'] = time.perf_counter() - path_setup_start_time
             
+        from multiprocessing.pool import ThreadPool
         self.__browser_thread = ThreadPool(1)
-        self.__read_thread_pool = ThreadPool(read_thread_count)
+        self.__read_executor = ReadExecutor(read_thread_count, min_read_thread_count, name="read")
+        # close() shuts writer down, so initialize() after close() needs new one.
+        self.__screenshot_writer = ScreenshotWriter()
         
         self.reset_driver(is_headless, window_width, window_height, is_enable_image, user_agent)
         
@@ -104,6 +2370,7 @@ class ChromeWebdriver():
             self.reset_websocket_listener(websocket_listening_function)
         
     
+    @_measure
     def reset_driver(self, 
                      is_headless:bool,
                      window_width:int= None, 
@@ -120,70 +2387,303 @@ class ChromeWebdriver():
         if user_agent == None and not self.__user_agent:
             user_agent = self.__user_agent
         
-        browser_version_by_bash = self.__get_browser_version_by_bash()
-        driver_file_name = self.__find_driver_file(browser_version_by_bash)
-        if driver_file_name == "":
-            driver_file_name = self.__download_driver(browser_version_by_bash)
-            
-        driver_file_path = f"{self.__get_drivers_path()}/{driver_file_name}"
-        temp_driver = self.__get_driver(is_headless, driver_file_path, window_width, window_height, is_enable_image, user_agent)
-        browser_version = self.__get_browser_version_by_driver(temp_driver)
-        driver_version = self.__get_driver_version(temp_driver)
-        user_agent = self.__get_user_agent(temp_driver)
-        temp_driver.quit()
-        
-        if driver_file_name == self.default_downloaded_driver_name:
-            driver_file_name = self.__change_driver_filename(driver_file_name, browser_version, driver_version)
-            driver_file_path = f"{self.__get_drivers_path()}/{driver_file_name}"
-        
-        self.__driver = self.__get_driver(is_headless, driver_file_path, window_width, window_height, is_enable_image, user_agent)
-        self.__user_agent = self.__get_user_agent(self.__driver)
+        driver_config = (is_headless, window_width, window_height, is_enable_image, user_agent)
+        # Run in browser thread after read tasks are finished, so tasks never see half-changed driver.
+        self.__submit_navigation(functools.partial(self.__reset_driver, driver_config), False).get()
         
+    @_measure
     def close(self):
-        self.__read_thread_pool.close()
-        self.__read_thread_pool.join()
+        self.__read_executor.close()
+        self.__read_executor.join()
         
         self.__browser_thread.close()
         self.__browser_thread.join()
         
+        if self.__navigation_listener:
+            self.__navigation_listener.cancel()
+            self.__navigation_listener = None
+        
+        if self.__websocket_listen_thread:
+            self.__websocket_listen_thread.cancel()
+            self.__websocket_listen_thread = None
+        
+        for capture in self.__websocket_captures:
+            capture.close()
+        self.__websocket_captures = []
+        
+        for capture in self.__response_captures:
+            capture.close()
+        self.__response_captures = []
+        
+        for screencast in self.__screencasts:
+            screencast.close()
+        self.__screencasts = []
+        if self.__screenshot_writer:
+            self.__screenshot_writer.close()
+        
+        self.__close_tab_workers()
+        
+        if self.__resource_blocker:
+            self.__resource_blocker.close()
+            self.__resource_blocker = None
+        
         if self.__driver:
             self.__driver.quit()
-            
-        if self.__websocket_listen_thread:
-            trio.run(self.send_cancel_listner)
-            self.__websocket_listen_thread.join()
+        
+        with self.__standby_lock:
+            self.__is_closing = True
+            standby_thread = self.__standby_thread
+        if standby_thread:
+            standby_thread.join()
+        with self.__standby_lock:
+            if self.__standby_driver:
+                self.__standby_driver.quit()
+                self.__standby_driver = None
             
         if self.__is_remove_profile_when_close:
-            profile_path = self.__get_profile_path()
-            self.__remove_directory(profile_path)
+            for slot in (0, 1):
+                self.__remove_directory_background(self.__get_profile_slot_path(slot))
+
+    @_measure
+    def create_profile_template(self,
+                                template_name:str,
+                                is_headless:bool,
+                                warm_urls:list[str] = None,
+                                timeout:float = 10,
+                                base_dir:str = None,
+                                **driver_options):
+        '''
+        Launch browser with new profile, open warm_urls and save the profile as template.\n
+        Use new ChromeWebdriver. It is closed after template is saved.\n
+        Parameters
+        -
+        template_name (str): 'profile_template_name' of initialize()\n
+        is_headless (bool): headless browser\n
+        warm_urls (list[str]): urls to fill caches of profile\n
+        timeout (float): timeout seconds of each url\n
+        base_dir (str): directory of 'data_dir_name'. default: directory of caller file\n
+        driver_options: other parameters of initialize()
+        '''
+        if not base_dir:
+            # 1 is wrapper of _measure
+            base_dir = _caller_directory(2)
+        
+        driver_options.pop('profile_template_name', None)
+        driver_options['profile_name'] = f".template-{template_name}-{uuid.uuid4().hex}"
+        driver_options['is_remove_profile_when_start'] = True
+        driver_options['is_remove_profile_when_close'] = False
+        # Build on separate instance, so state of this instance is kept even if it is initialized.
+        template_driver = ChromeWebdriver()
+        template_driver.initialize(is_headless, base_dir=base_dir, **driver_options)
+        try:
+            for url in warm_urls if warm_urls else []:
+                template_driver.open(timeout, url)
+        finally:
+            template_driver.close()
+        
+        profile_path = template_driver.__get_profile_path()
+        for file_name in ('SingletonLock', 'SingletonSocket', 'SingletonCookie'):
+            if os.path.lexists(f"{profile_path}/{file_name}"):
+                os.remove(f"{profile_path}/{file_name}")
+        
+        templates_path = template_driver.__get_profile_templates_path()
+        if not os.path.exists(templates_path):
+            os.mkdir(templates_path)
+        template_path = template_driver.__get_profile_template_path(template_name)
+        if os.path.exists(template_path):
+            trash_path = f"{templates_path}/.trash-{uuid.uuid4().hex}"
+            os.rename(template_path, trash_path)
+            self.__remove_directory_background(trash_path)
+        os.rename(profile_path, template_path)
 
     ################################################################################################################
     ################################################################################################################
     ################################################################################################################
     # Functions
+    # Reads of default priority 1. They don't wait elements.
+    __fast_read_task_names = {'save_screenshot', 'capture_screenshot', 'save_screenshot_cdp', 'snapshot'}
+    
+    @property
+    def metrics(self) -> Metrics:
+        return self.__metrics
+    
+    def stats(self) -> dict[str, dict]:
+        '''
+        Snapshot of metrics.\n
+        return
+        -
+        (dict): 'operations': latency histograms of public methods('open', ...), tasks('read.wait_elements', 'browser.open_url', ...)
+        and queue waits('read_queue_wait', 'browser_queue_wait').\n
+        'counters': 'read_timeout', 'read_error', 'read_expired', 'read_cancelled', 'browser_error', 'snapshot_capture', 'snapshot_hit', 'recycle'.\n
+        'queue': pending tasks of 'browser' thread and 'read' thread pool.\n
+        'read_executor': 'worker_count', 'idle_count', 'pending_count' of read executor.\n
+        'browser': 'process_count', 'rss_bytes', 'cpu_seconds', 'cpu_percent' of chromedriver and browser processes. None if not available.\n
+        'startup': startup_trace()
+        '''
+        stats = self.__metrics.snapshot()
+        with self.__epoch_condition:
+            stats['queue'] = {
+                'browser': self.__issued_epoch - self.__committed_epoch,
+                'read': sum(self.__epoch_read_counts.values()),
+            }
+        stats['read_executor'] = self.__read_executor.stats() if self.__read_executor else None
+        stats['browser'] = self.__sample_browser_processes()
+        stats['startup'] = self.startup_trace()
+        return stats
+    
+    def startup_trace(self) -> dict[str, float]:
+        '''
+        Seconds of startup phases of last initialize(), reset_driver() or recycle.\n
+        return
+        -
+        (dict[str, float]): 'import': import of threadingwebdriver, once per process\n
+        'path_setup': base_dir, data directories and profile of initialize()\n
+        'version_detection': browser version by capability cache, bash and driver\n
+        'driver_resolution': find or download chromedriver\n
+        'browser_launch': start chromedriver and browser\n
+        'total': sum of phases
+        '''
+        trace = dict(self.__startup_phases)
+        trace['total'] = sum(trace.values())
+        return trace
+    
+    def prometheus_text(self, prefix:str = "threadingwebdriver") -> str:
+        '''
+        stats() in Prometheus text exposition format.
+        '''
+        stats = self.stats()
+        lines = [f"# TYPE {prefix}_operation_seconds histogram"]
+        for operation, histogram in sorted(stats['operations'].items()):
+            for le, count in histogram['buckets'].items():
+                le_text = '+Inf' if le == float('inf') else repr(le)
+                lines.append(f'{prefix}_operation_seconds_bucket{{operation="{operation}",le="{le_text}"}} {count}')
+            lines.append(f'{prefix}_operation_seconds_sum{{operation="{operation}"}} {histogram["sum"]}')
+            lines.append(f'{prefix}_operation_seconds_count{{operation="{operation}"}} {histogram["count"]}')
+        
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for event, count in sorted(stats['counters'].items()):
+            lines.append(f'{prefix}_events_total{{event="{event}"}} {count}')
+        
+        lines.append(f"# TYPE {prefix}_queue_depth gauge")
+        for queue_name, depth in stats['queue'].items():
+            lines.append(f'{prefix}_queue_depth{{queue="{queue_name}"}} {depth}')
+        
+        browser = stats['browser']
+        if browser:
+            lines.append(f"# TYPE {prefix}_browser_processes gauge")
+            lines.append(f"{prefix}_browser_processes {browser['process_count']}")
+            lines.append(f"# TYPE {prefix}_browser_rss_bytes gauge")
+            lines.append(f"{prefix}_browser_rss_bytes {browser['rss_bytes']}")
+            lines.append(f"# TYPE {prefix}_browser_cpu_seconds_total counter")
+            lines.append(f"{prefix}_browser_cpu_seconds_total {browser['cpu_seconds']}")
+        return '\n'.join(lines) + '\n'
+    
+    @property
+    def driver(self) -> webdriver.Chrome:
+        '''
+        Current selenium driver. It is changed by reset_driver().
+        '''
+        return self.__driver
+    
+    @property
+    def navigation_state(self) -> NavigationState:
+        '''
+        Url and lifecycle events of main frame. is_connected is False with 'poll' wait strategy.
+        '''
+        return self.__navigation_state
 
-    def open_async(self, url:str):
+    def open_async(self, url:str, is_cancel_reads:bool = False, block_profiles:list[ResourceBlockProfile] = None):
         '''
+        Start new navigation epoch.\n
+        Read tasks issued after this are run after navigation is finished.\n
         Parameter
         -
-        url (str): check 'http://'
+        url (str): check 'http://'\n
+        is_cancel_reads (bool): False: start navigation after read tasks of previous epoch are finished.
+        True: start navigation now. Running read tasks of previous epoch raise NavigationEpochExpired.\n
+        block_profiles (list[ResourceBlockProfile]): set block profiles before this navigation. None keeps current profiles.\n
+        Returns
+        -
+        (AsyncResult) : AsyncResult.get() waits navigation is finished, and raise exception of navigation.
         '''
-        self.__browser_thread.apply_async(self.__driver.get, args=(url,))
+        return self.__navigate_async(url, is_cancel_reads, block_profiles)
     
-    def open(self, timeout:float, url:str) -> bool:
+    @_measure
+    def open(self,
+             timeout:float,
+             url:str,
+             is_cancel_reads:bool = False,
+             block_profiles:list[ResourceBlockProfile] = None,
+             ready_condition:ReadyCondition = None) -> bool:
         '''
         Parameters
         -
         timeout (float): timeout seconds\n
         url (str): check 'http://' and exist end '/'\n
+        is_cancel_reads (bool): same as open_async()\n
+        block_profiles (list[ResourceBlockProfile]): same as open_async()\n
+        ready_condition (ReadyCondition): DomContentLoaded(), NetworkIdle(idle_ms), ElementPresent(by, value), JavascriptCondition(expression).
+        None waits url is equal.\n
         Returns
         -
-        (bool) : Return 'True' if equal url.
+        (bool) : Return 'True' if equal url or ready_condition holds.
         '''
-        self.__browser_thread.apply_async(self.__driver.get, args=(url,))
-        result_url = self.url_to_be_async(timeout, url)
+        self.__navigate_async(url, is_cancel_reads, block_profiles)
+        if ready_condition is None:
+            result_url = self.url_to_be_async(timeout, url)
+        else:
+            result_url = self.__apply_read_async(self.__wait_ready, timeout, ready_condition)
         return result_url.get()
     
+    @_measure
+    def set_block_profiles(self, block_profiles:list[ResourceBlockProfile]):
+        '''
+        Block requests by resource type and url pattern from next navigation.\n
+        It is applied in order of browser thread. Empty list removes blocking.
+        '''
+        self.__browser_thread.apply_async(self.__apply_block_profiles, args=(block_profiles,)).get()
+    
+    def block_stats(self) -> dict[str, dict[str, int]]:
+        '''
+        return
+        -
+        (dict[str, dict[str, int]]): {profile name: {'blocked_request_count', 'estimated_saved_bytes'}}
+        '''
+        if self.__resource_blocker is None:
+            return {}
+        return self.__resource_blocker.stats()
+    
+    def element_cache_stats(self) -> dict[str, int]:
+        '''
+        return
+        -
+        (dict[str, int]): 'hit_count', 'miss_count', 'stale_count', 'eviction_count', 'size'. Empty if cache is disabled.
+        '''
+        if self.__element_cache is None:
+            return {}
+        return self.__element_cache.stats()
+    
+    @contextlib.contextmanager
+    def read_options(self, priority:int = None, timeout:float = None, cancel_token:CancelToken = None):
+        '''
+        Options of reads issued in this block by this thread.\n
+        Parameters
+        -
+        priority (int): higher runs first. default: 1 for screenshot and snapshot, 0 for others\n
+        timeout (float): deadline seconds from issue, including wait in queue. Raise TimeoutException.\n
+        cancel_token (CancelToken): CancelToken.cancel() cancels all reads of token
+        '''
+        previous = (getattr(self.__read_options, 'priority', None),
+                    getattr(self.__read_options, 'timeout', None),
+                    getattr(self.__read_options, 'cancel_token', None))
+        self.__read_options.priority = priority
+        self.__read_options.timeout = timeout
+        self.__read_options.cancel_token = cancel_token
+        try:
+            yield
+        finally:
+            self.__read_options.priority, self.__read_options.timeout, self.__read_options.cancel_token = previous
+    
     def url_to_be_async(self, timeout:float, url:str) -> BoolAsyncResult:
         '''
         Parameters
@@ -194,11 +2694,11 @@ class ChromeWebdriver():
         -
         (BoolAsyncResult) : BoolAsyncResult.get() return bool
         '''
-        expect_function = EC.url_to_be(url)
-        return self.__read_thread_pool.apply_async(WebDriverWait(self.__driver, timeout).until, args=(expect_function,))
+        return BoolAsyncResult(self.__apply_read_async(self.__wait_url_to_be, timeout, url))
     
+    @_measure
     def save_screenshot(self, filename:str) -> BoolAsyncResult:
-        result = self.__read_thread_pool.apply_async(self.__driver.save_screenshot, args=(filename,))
+        result = self.__apply_read_async(self.__save_screenshot, filename)
         return result.get()
         
     def save_screenshot_async(self, filename:str) -> BoolAsyncResult:
@@ -211,7 +2711,139 @@ class ChromeWebdriver():
         BoolAsyncResult : BoolAsyncResult.get() return bool
         -
         '''
-        return self.__read_thread_pool.apply_async(self.__driver.save_screenshot, args=(filename,))
+        return BoolAsyncResult(self.__apply_read_async(self.__save_screenshot, filename))
+    
+    def capture_screenshot_async(self,
+                                 format:str = 'png',
+                                 quality:int = None,
+                                 clip:tuple[float, float, float, float] = None,
+                                 element:WebElement = None,
+                                 is_full_page:bool = False) -> ScreenshotAsyncResult:
+        '''
+        Capture by CDP Page.captureScreenshot.\n
+        Parameters
+        -
+        format (str): 'png', 'jpeg' or 'webp'\n
+        quality (int): 0~100 of 'jpeg' and 'webp'\n
+        clip (tuple[float, float, float, float]): (x, y, width, height) of page in CSS pixels\n
+        element (WebElement): capture only element\n
+        is_full_page (bool): capture whole page beyond viewport\n
+        Returns
+        -
+        (ScreenshotAsyncResult) : ScreenshotAsyncResult.get() return image bytes. Base64 is decoded in get().
+        '''
+        async_result = self.__apply_read_async(self.__capture_screenshot, format, quality, clip, element, is_full_page)
+        return ScreenshotAsyncResult(async_result)
+    
+    @_measure
+    def capture_screenshot(self,
+                           format:str = 'png',
+                           quality:int = None,
+                           clip:tuple[float, float, float, float] = None,
+                           element:WebElement = None,
+                           is_full_page:bool = False) -> bytes:
+        '''
+        Same as capture_screenshot_async().get()
+        '''
+        return self.capture_screenshot_async(format, quality, clip, element, is_full_page).get()
+    
+    def save_screenshot_cdp_async(self,
+                                  filename:str,
+                                  format:str = None,
+                                  quality:int = None,
+                                  clip:tuple[float, float, float, float] = None,
+                                  element:WebElement = None,
+                                  is_full_page:bool = False) -> ScreenshotFileAsyncResult:
+        '''
+        Capture by CDP and write file in background writer. Read thread is not blocked by decoding and disk.\n
+        Parameters
+        -
+        filename (str): image filename\n
+        format (str): 'png', 'jpeg' or 'webp'. default: by extension of filename\n
+        quality, clip, element, is_full_page: same as capture_screenshot_async()\n
+        Returns
+        -
+        (ScreenshotFileAsyncResult) : ScreenshotFileAsyncResult.get() return True when file is written
+        '''
+        if format is None:
+            extension = os.path.splitext(filename)[1].lower()
+            format = {'.jpg': 'jpeg', '.jpeg': 'jpeg', '.webp': 'webp'}.get(extension, 'png')
+        async_result = self.__apply_read_async(self.__save_screenshot_cdp, filename, format, quality, clip, element, is_full_page)
+        return ScreenshotFileAsyncResult(async_result)
+    
+    @_measure
+    def save_screenshot_cdp(self,
+                            filename:str,
+                            format:str = None,
+                            quality:int = None,
+                            clip:tuple[float, float, float, float] = None,
+                            element:WebElement = None,
+                            is_full_page:bool = False) -> bool:
+        '''
+        Same as save_screenshot_cdp_async().get()
+        '''
+        return self.save_screenshot_cdp_async(filename, format, quality, clip, element, is_full_page).get()
+    
+    def start_screencast(self,
+                         format:str = 'jpeg',
+                         quality:int = 80,
+                         max_width:int = None,
+                         max_height:int = None,
+                         every_nth_frame:int = 1,
+                         directory:str = None,
+                         frame_function:Callable[[int, float, bytes], Any] = None) -> Screencast:
+        '''
+        Capture frame stream by CDP Page.startScreencast.\n
+        Parameters
+        -
+        format (str): 'jpeg' or 'png'\n
+        directory (str): write frames as '{index:08d}.jpg'\n
+        frame_function (Callable[[int, float, bytes], Any]): called with (index, timestamp, image bytes) in writer thread\n
+        Returns
+        -
+        (Screencast) : stats() for counters. close() to stop.
+        '''
+        screencast = Screencast(self.__screenshot_writer, format, quality, max_width, max_height, every_nth_frame, directory, frame_function)
+        if not screencast.start(self.__driver):
+            screencast.close()
+            raise WebDriverException("Devtools connection failed")
+        self.__screencasts.append(screencast)
+        return screencast
+    
+    def screenshot_writer_stats(self) -> dict[str, int]:
+        '''
+        return
+        -
+        (dict[str, int]): 'written_count', 'written_bytes', 'failed_count', 'dropped_count', 'pending_count'
+        '''
+        return self.__screenshot_writer.stats()
+    
+    def create_tab_workers(self, tab_count:int, read_thread_count:int = 1) -> list[TabWorker]:
+        '''
+        Open tabs in this browser, each driven by own CDP session, navigation thread and read thread pool.\n
+        Tabs are closed by close() and reset_driver().\n
+        Parameters
+        -
+        tab_count (int): count of new tabs\n
+        read_thread_count (int): read threads of each tab\n
+        Returns
+        -
+        (list[TabWorker]) : TabWorker.memory_usage() for javascript heap of each tab
+        '''
+        if self.__tab_devtools_thread is None:
+            self.__tab_connected_event.clear()
+            self.__tab_devtools_thread = DevtoolsEventThread(self.__driver, self.__hold_tab_connection, name="tab_workers")
+            if not self.__tab_devtools_thread.start(10) or not self.__tab_connected_event.wait(10):
+                self.__tab_devtools_thread.cancel()
+                self.__tab_devtools_thread = None
+                raise WebDriverException("Devtools connection failed")
+        
+        tab_workers = []
+        for _ in range(tab_count):
+            target_id, session = self.__tab_devtools_thread.run(self.__create_tab)
+            tab_workers.append(TabWorker(self.__tab_devtools_thread, self.__tab_root_connection, session, target_id, read_thread_count))
+        self.__tab_workers.extend(tab_workers)
+        return tab_workers
     
     def get_element_xpath_async(self, timeout:float, xpath:str) -> WebElementAsyncResult:
         '''
@@ -223,10 +2855,10 @@ class ChromeWebdriver():
         -
         WebElement\n
         '''
-        expect_function = EC.presence_of_element_located((By.XPATH, xpath))
-        async_result = self.__read_thread_pool.apply_async(WebDriverWait(self.__driver, timeout).until, args=(expect_function,))
+        async_result = self.__apply_read_async(self.__wait_elements, timeout, By.XPATH, xpath, False)
         return WebElementAsyncResult(async_result)
     
+    @_measure
     def get_element_xpath(self, timeout:float, xpath:str) -> WebElement:
         '''
         Parameters
@@ -237,10 +2869,10 @@ class ChromeWebdriver():
         -
         WebElement\n
         '''
-        expect_function = EC.presence_of_element_located((By.XPATH, xpath))
-        result = self.__read_thread_pool.apply_async(WebDriverWait(self.__driver, timeout).until, args=(expect_function,))
+        result = self.__apply_read_async(self.__wait_elements, timeout, By.XPATH, xpath, False)
         return result.get()
     
+    @_measure
     def get_element_id(self, timeout:float, id:str) -> WebElement:
         '''
         Parameters
@@ -251,10 +2883,10 @@ class ChromeWebdriver():
         -
         WebElement\n
         '''
-        expect_function = EC.presence_of_element_located((By.ID, id))
-        result = self.__read_thread_pool.apply_async(WebDriverWait(self.__driver, timeout).until, args=(expect_function,))
+        result = self.__apply_read_async(self.__wait_elements, timeout, By.ID, id, False)
         return result.get()
     
+    @_measure
     def get_elements_by_tag_name(self, timeout:float, tag_name:str) -> WebElement:
         '''
         Parameters
@@ -265,8 +2897,68 @@ class ChromeWebdriver():
         -
         WebElement\n
         '''
-        expect_function = EC.presence_of_all_elements_located((By.TAG_NAME, tag_name))
-        result = self.__read_thread_pool.apply_async(WebDriverWait(self.__driver, timeout).until, args=(expect_function,))
+        result = self.__apply_read_async(self.__wait_elements, timeout, By.TAG_NAME, tag_name, True)
+        return result.get()
+    
+    def get_elements_batch_async(self, timeout:float, locators:dict[str, tuple]) -> ElementsAsyncResult:
+        '''
+        Find all locators by one script per poll.\n
+        Parameters
+        -
+        timeout (float): timeout seconds\n
+        locators (dict[str, tuple]): {name: (By, locator)} or {name: (By, locator, property_name)}\n
+        ex) {'title': (By.XPATH, '/html/body/h1', 'textContent'), 'link': (By.ID, 'link')}\n
+        Returns
+        -
+        (ElementsAsyncResult) : ElementsAsyncResult.get() return {name: WebElement or value of property}
+        '''
+        async_result = self.__apply_read_async(self.__get_elements_batch, timeout, locators)
+        return ElementsAsyncResult(async_result)
+    
+    @_measure
+    def get_elements_batch(self, timeout:float, locators:dict[str, tuple]) -> dict[str, Any]:
+        '''
+        Find all locators by one script per poll.\n
+        Parameters
+        -
+        timeout (float): timeout seconds\n
+        locators (dict[str, tuple]): {name: (By, locator)} or {name: (By, locator, property_name)}\n
+        ex) {'title': (By.XPATH, '/html/body/h1', 'textContent'), 'link': (By.ID, 'link')}\n
+        return
+        -
+        (dict[str, Any]): {name: WebElement or value of property}. Raise TimeoutException if not found.
+        '''
+        result = self.__apply_read_async(self.__get_elements_batch, timeout, locators)
+        return result.get()
+    
+    def snapshot_async(self, is_refresh:bool = False) -> DomSnapshotAsyncResult:
+        '''
+        Capture rendered DOM once and query it in process.\n
+        Snapshot is cached until next navigation or url change.\n
+        Parameters
+        -
+        is_refresh (bool): capture again though url is not changed. ex) DOM is changed by script\n
+        Returns
+        -
+        (DomSnapshotAsyncResult) : DomSnapshotAsyncResult.get() return DomSnapshot
+        '''
+        async_result = self.__apply_read_async(self.__snapshot, is_refresh)
+        return DomSnapshotAsyncResult(async_result)
+    
+    @_measure
+    def snapshot(self, is_refresh:bool = False) -> DomSnapshot:
+        '''
+        Capture rendered DOM once and query it in process.\n
+        Snapshot is cached until next navigation or url change.\n
+        ex) titles = [td.text for td in driver.snapshot().css('table td.title')]\n
+        Parameters
+        -
+        is_refresh (bool): capture again though url is not changed. ex) DOM is changed by script\n
+        return
+        -
+        (DomSnapshot)
+        '''
+        result = self.__apply_read_async(self.__snapshot, is_refresh)
         return result.get()
     
     
@@ -337,51 +3029,716 @@ class ChromeWebdriver():
     ################################################################################################################
     ################################################################################################################
     # Privates
+    # Navigation Epoch
+    def __navigate_async(self, url:str, is_cancel_reads:bool, block_profiles:list[ResourceBlockProfile] = None) -> AsyncResult:
+        return self.__submit_navigation(functools.partial(self.__open_url, url, block_profiles), is_cancel_reads)
+    
+    def __submit_navigation(self, function:Callable, is_cancel_reads:bool) -> AsyncResult:
+        '''
+        Run function in browser thread as new navigation epoch.
+        '''
+        with self.__epoch_condition:
+            self.__issued_epoch += 1
+            epoch = self.__issued_epoch
+        return self.__browser_thread.apply_async(self.__navigate, args=(epoch, function, is_cancel_reads, time.perf_counter()))
+    
+    def __navigate(self, epoch:int, function:Callable, is_cancel_reads:bool, submitted_time:float):
+        with self.__epoch_condition:
+            if not is_cancel_reads:
+                self.__epoch_condition.wait_for(lambda: all(epoch <= e for e in self.__epoch_read_counts))
+            self.__started_epoch = epoch
+            self.__started_navigation_count = self.__navigation_state.navigation_count
+            self.__started_within_document_navigation_count = self.__navigation_state.within_document_navigation_count
+            self.__epoch_condition.notify_all()
+        self.__snapshot_cache = None
+        if self.__element_cache:
+            self.__element_cache.clear()
+        started_time = time.perf_counter()
+        self.__metrics.observe('browser_queue_wait', started_time - submitted_time)
+        try:
+            return function()
+        except Exception:
+            self.__metrics.increment('browser_error')
+            raise
+        finally:
+            self.__metrics.observe(f"browser.{self.__get_task_name(function)}", time.perf_counter() - started_time)
+            with self.__epoch_condition:
+                self.__committed_epoch = epoch
+                self.__submit_deferred_reads()
+                self.__epoch_condition.notify_all()
+    
+    def __open_url(self, url:str, block_profiles:list[ResourceBlockProfile]):
+        self.__check_recycle()
+        if block_profiles is not None:
+            self.__apply_block_profiles(block_profiles)
+        self.__previous_time_origin = None
+        if self.__page_load_strategy != 'normal' and (self.__wait_strategy != 'event' or not self.__navigation_state.is_connected):
+            # driver.get() may return before new document is committed. Polling must not see previous document.
+            try:
+                self.__previous_time_origin = self.__driver.execute_script("return performance.timeOrigin")
+            except WebDriverException:
+                pass
+        try:
+            self.__driver.get(url)
+        except WebDriverException as e:
+            if not self.__is_browser_crashed(e) or not self.__swap_standby(self.__driver_config):
+                raise
+            print(f"Browser crashed. Swapped standby browser. {type(e).__name__}")
+            if block_profiles is not None:
+                self.__apply_block_profiles(block_profiles)
+            self.__driver.get(url)
+    
+    def __apply_read_async(self, function:Callable, *args) -> ReadFuture:
+        '''
+        Run function in read executor, bound to current navigation epoch.\n
+        Read is submitted when navigation of its epoch is committed, so workers never wait navigation.
+        '''
+        priority = getattr(self.__read_options, 'priority', None)
+        if priority is None:
+            priority = 1 if self.__get_task_name(function) in self.__fast_read_task_names else 0
+        future = ReadFuture(priority, getattr(self.__read_options, 'timeout', None), getattr(self.__read_options, 'cancel_token', None))
+        with self.__epoch_condition:
+            epoch = self.__issued_epoch
+            self.__epoch_read_counts[epoch] = self.__epoch_read_counts.get(epoch, 0) + 1
+            future.add_done_callback(lambda _: self.__finish_read(epoch))
+            run_args = (epoch, function, args, time.perf_counter(), future)
+            if epoch <= self.__committed_epoch:
+                self.__submit_read(future, run_args)
+            else:
+                self.__deferred_reads.append((epoch, future, run_args))
+        return future
+    
+    def __submit_read(self, future:ReadFuture, run_args:tuple):
+        try:
+            self.__read_executor.submit(future, self.__run_read, *run_args)
+        except ValueError as e:
+            future._finish(exception=e)
+    
+    def __submit_deferred_reads(self):
+        '''
+        Called with epoch condition after navigation is committed.
+        '''
+        deferred_reads = []
+        for epoch, future, run_args in self.__deferred_reads:
+            if epoch <= self.__committed_epoch:
+                self.__submit_read(future, run_args)
+            else:
+                deferred_reads.append((epoch, future, run_args))
+        self.__deferred_reads = deferred_reads
+    
+    def __run_read(self, epoch:int, function:Callable, args:tuple, submitted_time:float, future:ReadFuture) -> Any:
+        started_time = time.perf_counter()
+        try:
+            self.__read_context.epoch = epoch
+            self.__read_context.future = future
+            self.__check_read_epoch()
+            started_time = time.perf_counter()
+            self.__metrics.observe('read_queue_wait', started_time - submitted_time)
+            return function(*args)
+        except TimeoutException:
+            self.__metrics.increment('read_timeout')
+            raise
+        except NavigationEpochExpired:
+            self.__metrics.increment('read_expired')
+            raise
+        except ReadCancelled:
+            self.__metrics.increment('read_cancelled')
+            raise
+        except Exception:
+            self.__metrics.increment('read_error')
+            raise
+        finally:
+            self.__metrics.observe(f"read.{self.__get_task_name(function)}", time.perf_counter() - started_time)
+            self.__read_context.epoch = None
+            self.__read_context.future = None
+    
+    def __get_task_name(self, function:Callable) -> str:
+        if isinstance(function, functools.partial):
+            function = function.func
+        # '_ChromeWebdriver__wait_elements' -> 'wait_elements'
+        return getattr(function, '__name__', 'task').split('__')[-1]
+    
+    def __sample_browser_processes(self) -> dict[str, float] | None:
+        driver = self.__driver
+        try:
+            pid = driver.service.process.pid
+        except AttributeError:
+            return None
+        sample = _sample_process_tree(pid)
+        if sample is None:
+            return None
+        
+        now = time.monotonic()
+        sample['cpu_percent'] = None
+        if self.__last_cpu_sample:
+            last_time, last_cpu_seconds = self.__last_cpu_sample
+            if last_time < now and last_cpu_seconds <= sample['cpu_seconds']:
+                sample['cpu_percent'] = 100 * (sample['cpu_seconds'] - last_cpu_seconds) / (now - last_time)
+        self.__last_cpu_sample = (now, sample['cpu_seconds'])
+        return sample
+    
+    def __finish_read(self, epoch:int):
+        with self.__epoch_condition:
+            self.__epoch_read_counts[epoch] -= 1
+            if self.__epoch_read_counts[epoch] == 0:
+                del self.__epoch_read_counts[epoch]
+            self.__epoch_condition.notify_all()
+    
+    def __check_read_epoch(self):
+        '''
+        Raise NavigationEpochExpired if newer navigation is started. Called between polls.
+        '''
+        epoch = getattr(self.__read_context, 'epoch', None)
+        if epoch is not None and epoch < self.__started_epoch:
+            raise NavigationEpochExpired(f"Navigation epoch {epoch} is expired. current:{self.__started_epoch}")
+        future:ReadFuture = getattr(self.__read_context, 'future', None)
+        if future is not None:
+            future.check()
+    
+    def __wait_navigation_state(self, predicate:Callable[[NavigationState], bool], timeout:float) -> bool:
+        '''
+        NavigationState.wait_for() in short chunks, checking cancel between chunks.
+        '''
+        end_time = time.monotonic() + timeout
+        while True:
+            remaining = end_time - time.monotonic()
+            if self.__navigation_state.wait_for(predicate, max(0, min(remaining, POLL_FREQUENCY))):
+                return True
+            if remaining <= 0 or not self.__navigation_state.is_connected:
+                return False
+            self.__check_read_epoch()
+    
+    # Driver Lifecycle
+    def __reset_driver(self, driver_config:tuple):
+        '''
+        Run in browser thread.
+        '''
+        if self.__is_hot_standby and self.__swap_standby(driver_config):
+            return
+        
+        if self.__driver:
+            try:
+                self.__driver.quit()
+            except WebDriverException:
+                pass
+            self.__driver = None
+        
+        self.__driver_config = driver_config
+        phases = {}
+        self.__driver = self.__create_driver(*driver_config, profile_path=self.__get_profile_path(), phases=phases)
+        self.__update_startup_phases(phases)
+        self.__on_driver_changed()
+        
+        if self.__is_hot_standby:
+            self.__start_standby(self.__standby_profile_slot)
+    
+    def __update_startup_phases(self, phases:dict[str, float]):
+        for phase, seconds in phases.items():
+            self.__metrics.observe(f"startup.{phase}", seconds)
+        self.__startup_phases = {phase: seconds for phase, seconds in self.__startup_phases.items() if phase in ('import', 'path_setup')}
+        self.__startup_phases.update(phases)
+    
+    def __on_driver_changed(self):
+        self.__close_tab_workers()
+        with self.__snapshot_lock:
+            self.__snapshot_cache = None
+        if self.__element_cache:
+            self.__element_cache.clear()
+        self.__recycle_navigation_count = 0
+        self.__recycle_checked_time = time.monotonic()
+        if self.__recycle_policy and self.__recycle_policy.max_js_heap_bytes:
+            try:
+                self.__driver.execute_cdp_cmd('Performance.enable', {})
+            except WebDriverException as e:
+                print(f"Performance metrics are not enabled. {type(e).__name__}")
+        self.__user_agent = self.__get_user_agent(self.__driver)
+        self.__reset_navigation_listener()
+        if self.__resource_blocker:
+            self.__resource_blocker.close()
+            if not self.__resource_blocker.start(self.__driver):
+                print("Resource blocker is not connected.")
+        self.__restart_listeners()
+    
+    def __restart_listeners(self):
+        '''
+        Move websocket listener, captures and screencasts to new driver.
+        Closed ones are forgotten, and ones failed to connect are closed, so their consumers stop.
+        '''
+        if self.__websocket_listen_thread:
+            self.reset_websocket_listener(self.__websocket_listening_function)
+        
+        for name, listeners in (('Websocket capture', self.__websocket_captures),
+                                ('Response capture', self.__response_captures),
+                                ('Screencast', self.__screencasts)):
+            active_listeners = []
+            for listener in listeners:
+                if listener.is_closed:
+                    continue
+                if listener.start(self.__driver):
+                    active_listeners.append(listener)
+                else:
+                    print(f"{name} is not connected to new browser. It is closed.")
+                    listener.close()
+            listeners[:] = active_listeners
+    
+    def __check_recycle(self):
+        '''
+        Run in browser thread before navigation.
+        '''
+        policy = self.__recycle_policy
+        if policy is None:
+            return
+        
+        reason = None
+        values = {'navigation_count': self.__recycle_navigation_count}
+        if policy.max_navigation_count and policy.max_navigation_count <= self.__recycle_navigation_count:
+            reason = 'navigation_count'
+        
+        now = time.monotonic()
+        if reason is None and (policy.max_js_heap_bytes or policy.max_rss_bytes) and policy.check_interval <= now - self.__recycle_checked_time:
+            self.__recycle_checked_time = now
+            if policy.max_js_heap_bytes:
+                values['js_heap_bytes'] = self.__get_js_heap_bytes()
+                if values['js_heap_bytes'] is not None and policy.max_js_heap_bytes <= values['js_heap_bytes']:
+                    reason = 'js_heap_bytes'
+            if reason is None and policy.max_rss_bytes:
+                sample = self.__sample_browser_processes()
+                values['rss_bytes'] = sample['rss_bytes'] if sample else None
+                if values['rss_bytes'] is not None and policy.max_rss_bytes <= values['rss_bytes']:
+                    reason = 'rss_bytes'
+        
+        if reason:
+            self.__recycle(reason, values)
+        self.__recycle_navigation_count += 1
+    
+    def __get_js_heap_bytes(self) -> int | None:
+        try:
+            metrics = self.__driver.execute_cdp_cmd('Performance.getMetrics', {})['metrics']
+        except WebDriverException:
+            return None
+        for metric in metrics:
+            if metric['name'] == 'JSHeapUsedSize':
+                return int(metric['value'])
+        return None
+    
+    def __recycle(self, reason:str, values:dict):
+        '''
+        Run in browser thread. Restart browser on same profile after in-flight reads are finished.
+        '''
+        # Reads of previous epochs are already drained unless is_cancel_reads. They expire at next poll.
+        with self.__epoch_condition:
+            self.__epoch_condition.wait_for(lambda: all(self.__started_epoch <= e for e in self.__epoch_read_counts))
+        
+        print(f"Recycle browser. {reason}: {values}")
+        self.__metrics.increment('recycle')
+        if self.__driver:
+            try:
+                self.__driver.quit()
+            except WebDriverException:
+                pass
+            self.__driver = None
+        phases = {}
+        self.__driver = self.__create_driver(*self.__driver_config, profile_path=self.__get_profile_path(), phases=phases)
+        self.__update_startup_phases(phases)
+        self.__on_driver_changed()
+        
+        if self.__recycle_policy.callback:
+            try:
+                self.__recycle_policy.callback(reason, values)
+            except Exception as e:
+                print(f"Recycle callback failed. {type(e).__name__}: {e}")
+    
+    def __is_browser_crashed(self, exception:WebDriverException) -> bool:
+        if isinstance(exception, InvalidSessionIdException):
+            return True
+        message = str(exception.msg).lower() if exception.msg else ""
+        return any(keyword in message for keyword in ('crash', 'chrome not reachable', 'disconnected', 'no such window'))
+    
+    def __swap_standby(self, driver_config:tuple) -> bool:
+        '''
+        Run in browser thread. Swap standby driver in and start new standby in background.\n
+        return
+        -
+        (bool): False if standby is not ready or config is different
+        '''
+        with self.__standby_lock:
+            if self.__standby_driver is None or self.__standby_config != driver_config:
+                return False
+            standby_driver = self.__standby_driver
+            self.__standby_driver = None
+        
+        old_driver = self.__driver
+        old_profile_slot = self.__active_profile_slot
+        self.__driver = standby_driver
+        self.__driver_config = driver_config
+        self.__active_profile_slot = self.__standby_profile_slot
+        self.__standby_profile_slot = old_profile_slot
+        self.__on_driver_changed()
+        self.__start_standby(old_profile_slot, old_driver)
+        return True
+    
+    def __start_standby(self, profile_slot:int, old_driver:webdriver.Chrome = None):
+        with self.__standby_lock:
+            if self.__is_closing:
+                return
+            previous_thread = self.__standby_thread
+            self.__standby_thread = threading.Thread(target=self.__launch_standby,
+                                                     args=(self.__driver_config, profile_slot, old_driver, previous_thread),
+                                                     name="standby_launcher",
+                                                     daemon=True)
+            self.__standby_thread.start()
+    
+    def __launch_standby(self, driver_config:tuple, profile_slot:int, old_driver:webdriver.Chrome, previous_thread:threading.Thread):
+        if previous_thread:
+            previous_thread.join()
+        
+        with self.__standby_lock:
+            # Standby of other config.
+            if self.__standby_driver:
+                old_standby_driver = self.__standby_driver
+                self.__standby_driver = None
+            else:
+                old_standby_driver = None
+        
+        for driver in (old_driver, old_standby_driver):
+            if driver:
+                try:
+                    driver.quit()
+                except WebDriverException:
+                    pass
+        
+        if self.__is_closing:
+            return
+        
+        try:
+            profile_path = self.__get_profile_slot_path(profile_slot)
+            self.__prepare_profile_directory(profile_path)
+            standby_driver = self.__create_driver(*driver_config, profile_path=profile_path)
+        except Exception as e:
+            print(f"Launch standby browser failed. {type(e).__name__}: {e}")
+            return
+        
+        with self.__standby_lock:
+            if self.__is_closing:
+                standby_driver.quit()
+                return
+            self.__standby_driver = standby_driver
+            self.__standby_config = driver_config
+            self.__standby_profile_slot = profile_slot
+    
+    # Resource Block
+    def __apply_block_profiles(self, block_profiles:list[ResourceBlockProfile]):
+        if self.__resource_blocker is None:
+            if not block_profiles:
+                return
+            self.__resource_blocker = ResourceBlocker()
+            if not self.__resource_blocker.start(self.__driver):
+                self.__resource_blocker.close()
+                self.__resource_blocker = None
+                raise WebDriverException("Devtools connection failed")
+        self.__resource_blocker.set_profiles(block_profiles)
+    
+    # Wait
+    def __until(self, timeout:float, expect_function:Callable) -> Any:
+        from selenium.webdriver.support.wait import WebDriverWait
+        def expect_in_epoch(driver):
+            self.__check_read_epoch()
+            return expect_function(driver)
+        return WebDriverWait(self.__driver, timeout).until(expect_in_epoch)
+    
+    def __wait_url_to_be(self, timeout:float, url:str) -> bool:
+        from selenium.webdriver.support import expected_conditions as EC
+        if self.__wait_strategy == 'event' and self.__navigation_state.is_connected:
+            end_time = time.monotonic() + timeout
+            if self.__wait_navigation_state(lambda state: state.url == url, timeout):
+                return True
+            # Disconnected or url of event is different from current_url.
+            remaining = end_time - time.monotonic()
+            if self.__driver.current_url == url:
+                return True
+            if remaining <= 0:
+                raise TimeoutException(f"Url is not '{url}'")
+            timeout = remaining
+        return self.__until(timeout, EC.url_to_be(url))
+    
+    def __wait_ready(self, timeout:float, ready_condition:ReadyCondition) -> bool:
+        end_time = time.monotonic() + timeout
+        navigation_state = self.__navigation_state
+        if self.__wait_strategy == 'event' and navigation_state.is_connected:
+            # With 'eager' or 'none' page load strategy, navigation may not be committed yet.
+            # Fragment only url change commits by within document navigation.
+            started_navigation_count = self.__started_navigation_count
+            started_within_document_navigation_count = self.__started_within_document_navigation_count
+            self.__wait_navigation_state(lambda state: started_navigation_count < state.navigation_count
+                                         or started_within_document_navigation_count < state.within_document_navigation_count, timeout)
+            if ready_condition.is_ready_by_event(navigation_state) is not None:
+                remaining = max(0, end_time - time.monotonic())
+                if self.__wait_navigation_state(lambda state: ready_condition.is_ready_by_event(state), remaining):
+                    return True
+        elif self.__previous_time_origin is not None:
+            previous_time_origin = self.__previous_time_origin
+            self.__until(max(0, end_time - time.monotonic()), lambda driver: driver.execute_script("return performance.timeOrigin") != previous_time_origin)
+        
+        if isinstance(ready_condition, ElementPresent):
+            self.__wait_elements(max(0, end_time - time.monotonic()), ready_condition.by, ready_condition.value, False)
+            return True
+        return self.__until(max(0, end_time - time.monotonic()), ready_condition.is_ready)
+    
+    def __wait_elements(self, timeout:float, by:str, value:str, is_all:bool) -> WebElement | list[WebElement]:
+        # Lists are not cached. Elements matched after lookup would be missed.
+        if self.__element_cache is None or is_all:
+            return self.__find_elements(timeout, by, value, is_all)
+        
+        driver = self.__driver
+        if self.__navigation_state.is_connected:
+            scope = (id(driver), self.__read_context.epoch, self.__navigation_state.loader_id)
+        else:
+            scope = (id(driver), self.__read_context.epoch)
+        locator = (by, value, is_all)
+        found = self.__element_cache.get(scope, locator)
+        if found is not None:
+            if not self.__is_element_cache_check_connected or self.__is_connected(driver, found):
+                return found
+            self.__element_cache.invalidate(scope, locator)
+        
+        found = self.__find_elements(timeout, by, value, is_all)
+        self.__element_cache.put(scope, locator, found)
+        return found
+    
+    def __is_connected(self, driver:webdriver.Chrome, found:WebElement | list[WebElement]) -> bool:
+        elements = found if isinstance(found, list) else [found]
+        try:
+            return driver.execute_script("return arguments[0].every(element => element.isConnected);", elements)
+        except WebDriverException:
+            # StaleElementReferenceException
+            return False
+    
+    def __find_elements(self, timeout:float, by:str, value:str, is_all:bool) -> WebElement | list[WebElement]:
+        from selenium.webdriver.support import expected_conditions as EC
+        if self.__wait_strategy == 'event':
+            end_time = time.monotonic() + timeout
+            while True:
+                remaining = end_time - time.monotonic()
+                # Wait in chunk shorter than script timeout of session(default 30 seconds),
+                # and short enough to stop cancelled read soon.
+                chunk_ms = int(max(0, min(remaining, 2)) * 1000)
+                self.__check_read_epoch()
+                try:
+                    found = self.__driver.execute_async_script(_WAIT_ELEMENTS_SCRIPT, by, value, is_all, chunk_ms)
+                except WebDriverException:
+                    # Navigation while waiting or invalid locator.
+                    break
+                if found:
+                    return found
+                if end_time <= time.monotonic():
+                    raise TimeoutException(f"Not found element. by:{by} value:{value}")
+            timeout = max(0, end_time - time.monotonic())
+        
+        if is_all:
+            expect_function = EC.presence_of_all_elements_located((by, value))
+        else:
+            expect_function = EC.presence_of_element_located((by, value))
+        return self.__until(timeout, expect_function)
+    
+    # Read
+    def __save_screenshot(self, filename:str) -> bool:
+        return self.__driver.save_screenshot(filename)
+    
+    def __capture_screenshot(self,
+                             format:str,
+                             quality:int,
+                             clip:tuple[float, float, float, float],
+                             element:WebElement,
+                             is_full_page:bool) -> str:
+        '''
+        return
+        -
+        (str): base64 image
+        '''
+        if format not in ('png', 'jpeg', 'webp'):
+            raise ValueError(f"Unknown screenshot format: {format}")
+        params = {'format': format}
+        if quality is not None and format != 'png':
+            params['quality'] = quality
+        
+        if element is not None:
+            rect = element.rect
+            clip = (rect['x'], rect['y'], rect['width'], rect['height'])
+        elif is_full_page:
+            metrics = self.__driver.execute_cdp_cmd('Page.getLayoutMetrics', {})
+            content_size = metrics.get('cssContentSize') or metrics['contentSize']
+            clip = (0, 0, content_size['width'], content_size['height'])
+        
+        if clip is not None:
+            x, y, width, height = clip
+            params['clip'] = {'x': x, 'y': y, 'width': width, 'height': height, 'scale': 1}
+            params['captureBeyondViewport'] = True
+        self.__check_read_epoch()
+        return self.__driver.execute_cdp_cmd('Page.captureScreenshot', params)['data']
+    
+    def __save_screenshot_cdp(self, filename:str, *capture_args) -> Future:
+        data = self.__capture_screenshot(*capture_args)
+        return self.__screenshot_writer.submit(data, filename)
+    
+    def __snapshot(self, is_refresh:bool) -> DomSnapshot:
+        driver = self.__driver
+        if self.__navigation_state.is_connected:
+            url = self.__navigation_state.url
+            key = (id(driver), self.__read_context.epoch, self.__navigation_state.navigation_count, url)
+        else:
+            url = driver.current_url
+            key = (id(driver), self.__read_context.epoch, url)
+        
+        # Lock while capture, so concurrent reads share one capture.
+        with self.__snapshot_lock:
+            if not is_refresh and self.__snapshot_cache and self.__snapshot_cache[0] == key:
+                self.__metrics.increment('snapshot_hit')
+                return self.__snapshot_cache[1]
+            self.__check_read_epoch()
+            snapshot = DomSnapshot(driver.page_source, url)
+            self.__snapshot_cache = (key, snapshot)
+            self.__metrics.increment('snapshot_capture')
+            return snapshot
+    
+    def __get_elements_batch(self, timeout:float, locators:dict[str, tuple]) -> dict[str, Any]:
+        pending_locators = {}
+        for name, locator in locators.items():
+            by, value = locator[0], locator[1]
+            property_name = locator[2] if 2 < len(locator) else None
+            pending_locators[name] = [name, by, value, property_name, False]
+        
+        found_elements = {}
+        end_time = time.monotonic() + timeout
+        while True:
+            found, errors = self.__driver.execute_script(_FIND_ELEMENTS_BATCH_SCRIPT, list(pending_locators.values()))
+            if errors:
+                raise InvalidSelectorException(f"Invalid locators: {errors}")
+            for name, element in found.items():
+                found_elements[name] = element
+                pending_locators.pop(name, None)
+            
+            if not pending_locators:
+                return {name: found_elements[name] for name in locators}
+            
+            if end_time < time.monotonic():
+                raise TimeoutException(f"Not found locators: {list(pending_locators)}")
+            time.sleep(POLL_FREQUENCY)
+            self.__check_read_epoch()
+    
     # Path and File
     def __get_data_path(self): return f"{self.__running_path}/{self.__data_dir_name}"
     def __get_drivers_path(self): return f"{self.__running_path}/{self.__data_dir_name}/drivers"
     def __get_profiles_path(self): return f"{self.__running_path}/{self.__data_dir_name}/profiles"
-    def __get_profile_path(self): return f"{self.__running_path}/{self.__data_dir_name}/profiles/{self.__profile_name}"
-    
-    def __remove_directory(self, path:str):
-        if os.path.isdir(path):
-            path_list = os.listdir(path)
-            for p in path_list:
-                joined_path = os.path.join(path, p)
-                self.__remove_directory(joined_path)
-            os.rmdir(path)
-        elif os.path.isfile(path):
-            os.remove(path)
+    def __get_profile_path(self): return self.__get_profile_slot_path(self.__active_profile_slot)
+    def __get_profile_slot_path(self, slot:int): return f"{self.__running_path}/{self.__data_dir_name}/profiles/{self.__profile_name}{'.standby' if slot else ''}"
+    
+    def __get_capability_cache_path(self): return f"{self.__running_path}/{self.__data_dir_name}/capabilities.json"
+    
+    def __get_profile_templates_path(self): return f"{self.__running_path}/{self.__data_dir_name}/profile_templates"
+    def __get_profile_template_path(self, template_name:str): return f"{self.__running_path}/{self.__data_dir_name}/profile_templates/{template_name}"
+    
+    def __prepare_profile_directory(self, profile_path:str):
+        if os.path.exists(profile_path):
+            return
+        template_path = self.__get_profile_template_path(self.__profile_template_name) if self.__profile_template_name else None
+        if template_path and os.path.isdir(template_path):
+            self.__clone_directory(template_path, profile_path)
+        else:
+            os.mkdir(profile_path)
+    
+    def __remove_directory_background(self, path:str):
+        '''
+        Rename to '.trash-*' in same directory and delete in background thread.
+        Trash of killed process is deleted by next initialize().
+        '''
+        if not os.path.exists(path):
+            return
+        trash_path = path
+        if not os.path.basename(path).startswith('.trash-'):
+            trash_path = f"{os.path.dirname(path)}/.trash-{uuid.uuid4().hex}"
+            os.rename(path, trash_path)
+        threading.Thread(target=shutil.rmtree, args=(trash_path, True), name="remove_directory", daemon=True).start()
+    
+    def __clone_directory(self, src_path:str, dst_path:str):
+        '''
+        Copy-on-write clone(reflink on Linux, clonefile on macOS) if file system supports. Fallback to copy.
+        '''
+        temp_path = f"{os.path.dirname(dst_path)}/.clone-{uuid.uuid4().hex}"
+        uname = platform.uname()
+        if uname.system == "Darwin":
+            command = ['cp', '-c', '-R', src_path, temp_path]
+        else:
+            command = ['cp', '-a', '--reflink=auto', src_path, temp_path]
+        try:
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except (OSError, subprocess.CalledProcessError):
+            shutil.rmtree(temp_path, True)
+            shutil.copytree(src_path, temp_path, symlinks=True)
+        os.rename(temp_path, dst_path)
     
     def __find_driver_file(self, chrome_version:str) -> str:
-        driver_files = self.__get_driver_files()
-        driver_file_version_list = []
-        for file_name in driver_files:
-            file_driver_version, file_chrome_version = self.__get_driver_versions_from_file_name(file_name)
-            if file_driver_version == chrome_version:
-                return file_name
-            driver_file_version_list.append((file_name, file_driver_version, file_chrome_version))
-        
-        for file_name, _, file_chrome_version in driver_file_version_list:
-            if file_chrome_version == chrome_version:
-                return file_name
-            
-        for file_name, _, file_chrome_version in driver_file_version_list:
-            if file_name == self.__driver_name:
-                return file_name
+        manifest = self.__get_driver_manifest()
+        
+        file_name = manifest['browser_versions'].get(chrome_version)
+        if file_name:
+            return file_name
+        
+        file_name = manifest['driver_versions'].get(chrome_version)
+        if file_name:
+            return file_name
+        
+        if self.__driver_name in manifest['files']:
+            return self.__driver_name
             
-        for file_name, _, file_chrome_version in driver_file_version_list:
-            if file_name == self.default_downloaded_driver_name:
-                return file_name
+        if self.default_downloaded_driver_name in manifest['files']:
+            return self.default_downloaded_driver_name
             
         return ""
     
+    def __get_driver_file_name(self, browser_version:str, driver_version:str) -> str:
+        return f"{self.__driver_name}{self.separator}{self.browser_version_separator}{browser_version}{self.separator}{self.driver_version_separator}{driver_version}"
+    
     def __change_driver_filename(self, driver_file_name:str, browser_version:str, driver_version:str) -> str:
-        dst_filename = f"{self.__driver_name}{self.separator}{self.browser_version_separator}{browser_version}{self.separator}{self.driver_version_separator}{driver_version}"
+        dst_filename = self.__get_driver_file_name(browser_version, driver_version)
         src_path = f"{self.__get_drivers_path()}/{driver_file_name}"
         dst_path = f"{self.__get_drivers_path()}/{dst_filename}"
-        os.rename(src_path, dst_path)
+        with self.__lock_driver_install():
+            if not os.path.exists(src_path):
+                # Renamed by other process.
+                self.__driver_manifest = None
+                return self.__find_driver_file(browser_version)
+            os.rename(src_path, dst_path)
+        self.__driver_manifest = None
         return dst_filename
+    
+    @contextlib.contextmanager
+    def __lock_driver_install(self):
+        '''
+        Cross-process lock of drivers directory. fcntl.flock, or msvcrt.locking of first byte on windows.
+        '''
+        with open(f"{self.__get_drivers_path()}/.install.lock", 'a') as lock_file:
+            if platform.uname().system == "Windows":
+                import msvcrt
+                lock_file.seek(0)
+                while True:
+                    try:
+                        # LK_LOCK retries for 10 seconds and raise OSError.
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass
+                try:
+                    yield
+                finally:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
 
     def __get_driver_versions_from_file_name(self, file_name:str) -> (str, str):
         '''
@@ -424,12 +3781,71 @@ class ChromeWebdriver():
         driver_files.sort()
         return driver_files
     
+    ################################################################################################################
+    ################################################################################################################
+    ################################################################################################################
+    # Driver Manifest
+    '''
+    Installed drivers are indexed in 'data/driver_manifest.json' by browser version and driver version.
+    Manifest is rebuilt only if mtime of drivers directory is changed.
+    '''
+    def __get_driver_manifest_path(self): return f"{self.__running_path}/{self.__data_dir_name}/driver_manifest.json"
+    
+    def __get_driver_manifest(self) -> dict:
+        drivers_directory_mtime_ns = os.stat(self.__get_drivers_path()).st_mtime_ns
+        manifest = self.__driver_manifest
+        if manifest is None:
+            try:
+                with open(self.__get_driver_manifest_path(), 'r') as file:
+                    manifest = json.load(file)
+            except (OSError, ValueError):
+                manifest = None
+        
+        if manifest is None or\
+            manifest.get('driver_name') != self.__driver_name or\
+            manifest.get('drivers_directory_mtime_ns') != drivers_directory_mtime_ns:
+            manifest = self.__build_driver_manifest(drivers_directory_mtime_ns)
+            try:
+                self.__write_json_file(self.__get_driver_manifest_path(), manifest)
+            except OSError as e:
+                print(f"Save driver manifest failed. {e}")
+        
+        self.__driver_manifest = manifest
+        return manifest
+    
+    def __build_driver_manifest(self, drivers_directory_mtime_ns:int) -> dict:
+        files = {}
+        browser_versions = {}
+        driver_versions = {}
+        for file_name in self.__get_driver_files():
+            browser_version, driver_version = self.__get_driver_versions_from_file_name(file_name)
+            files[file_name] = {'browser_version': browser_version, 'driver_version': driver_version}
+            if browser_version:
+                browser_versions.setdefault(browser_version, file_name)
+            if driver_version:
+                driver_versions.setdefault(driver_version, file_name)
+        
+        return {
+            'driver_name': self.__driver_name,
+            'drivers_directory_mtime_ns': drivers_directory_mtime_ns,
+            'files': files,
+            'browser_versions': browser_versions,
+            'driver_versions': driver_versions,
+        }
+    
+    def __write_json_file(self, path:str, data:dict):
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w') as file:
+            json.dump(data, file, indent=2)
+        os.replace(temp_path, path)
+    
     ################################################################################################################
     ################################################################################################################
     ################################################################################################################
     # Version
     def __get_driver_version(self, driver:webdriver.Chrome) -> str: return driver.capabilities['chrome']['chromedriverVersion'].split(' ')[0]
     def __get_browser_version_by_driver(self, driver:webdriver.Chrome) -> str: return driver.capabilities['browserVersion'].split(' ')[0]
+    def __get_driver_version_by_file(self, driver_file_path:str) -> str: return subprocess.check_output([driver_file_path, '--version']).decode().split(' ')[1]
     def __get_browser_version_by_bash(self) -> str:
         result_bytes = b''
         uname = platform.uname()
@@ -446,6 +3862,94 @@ class ChromeWebdriver():
         return result_str.split(' ')[2]
     
     
+    def __get_browser_binary_path(self) -> str:
+        uname = platform.uname()
+        binary_path = None
+        if uname.system == "Darwin":
+            binary_path = '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome'
+        elif uname.system == "Linux":
+            binary_path = shutil.which('google-chrome')
+        
+        if not binary_path or not os.path.exists(binary_path):
+            return ""
+        return os.path.realpath(binary_path)
+    
+    ################################################################################################################
+    ################################################################################################################
+    ################################################################################################################
+    # Capability Cache
+    '''
+    Capabilities of (browser binary, driver file) are saved in 'data/capabilities.json'.
+    Cache key is browser binary path and its mtime, so upgrading browser invalidates cache.
+    '''
+    def __get_capability_cache_key(self, browser_binary_path:str) -> str:
+        return f"{browser_binary_path}:{os.stat(browser_binary_path).st_mtime_ns}"
+    
+    def __read_capability_cache(self) -> dict:
+        try:
+            with open(self.__get_capability_cache_path(), 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+    
+    def __load_capability_cache(self, browser_binary_path:str, requested_user_agent:str) -> dict | None:
+        '''
+        return
+        -
+        (dict | None): None if cache miss or invalidated
+        '''
+        if not browser_binary_path:
+            return None
+        
+        try:
+            cache_key = self.__get_capability_cache_key(browser_binary_path)
+        except OSError:
+            return None
+        
+        capability = self.__read_capability_cache().get(cache_key)
+        if not capability or capability.get('requested_user_agent') != requested_user_agent:
+            return None
+        
+        driver_file_path = f"{self.__get_drivers_path()}/{capability['driver_file_name']}"
+        try:
+            if os.stat(driver_file_path).st_mtime_ns != capability['driver_file_mtime_ns']:
+                return None
+        except OSError:
+            return None
+        return capability
+    
+    def __save_capability_cache(self,
+                                browser_binary_path:str,
+                                requested_user_agent:str,
+                                driver_file_name:str,
+                                browser_version:str,
+                                driver_version:str,
+                                user_agent:str):
+        if not browser_binary_path:
+            return
+        
+        try:
+            cache_key = self.__get_capability_cache_key(browser_binary_path)
+            driver_file_mtime_ns = os.stat(f"{self.__get_drivers_path()}/{driver_file_name}").st_mtime_ns
+        except OSError:
+            return
+        
+        # Remove entries of old browser binary.
+        capability_cache = {key: capability for key, capability in self.__read_capability_cache().items()
+                            if not key.startswith(f"{browser_binary_path}:")}
+        capability_cache[cache_key] = {
+            'driver_file_name': driver_file_name,
+            'driver_file_mtime_ns': driver_file_mtime_ns,
+            'browser_version': browser_version,
+            'driver_version': driver_version,
+            'requested_user_agent': requested_user_agent,
+            'user_agent': user_agent,
+        }
+        try:
+            self.__write_json_file(self.__get_capability_cache_path(), capability_cache)
+        except OSError as e:
+            print(f"Save capability cache failed. {e}")
+    
     ################################################################################################################
     ################################################################################################################
     ################################################################################################################
@@ -472,67 +3976,264 @@ class ChromeWebdriver():
         'win32'
         'win64'
         '''
-        url = "https://googlechromelabs.github.io/chrome-for-testing/known-good-versions-with-downloads.json"
-        response = requests.get(url)
-        response_json = response.json()
-        versions = response_json['versions']
-        
-        download_url = ""
-        for v in versions:
-            if v['version'] == chrome_version:
-                for platforms in v['downloads']['chromedriver']:
-                    if platforms['platform'] == platform_name:
-                        download_url = platforms['url']
+        metadata_file_name = "known-good-versions-with-downloads.json"
+        download_urls = self.__get_driver_metadata(metadata_file_name, platform_name)
+        download_url = download_urls.get(chrome_version, "")
+        if download_url == "":
+            download_urls = self.__get_driver_metadata(metadata_file_name, platform_name, is_revalidate=True)
+            download_url = download_urls.get(chrome_version, "")
         
         if download_url == "":
-            url = "https://googlechromelabs.github.io/chrome-for-testing/latest-patch-versions-per-build-with-downloads.json"
-            response = requests.get(url)
-            response_json = response.json()
-            
             splitted_chrome_version = chrome_version.split('.')
             build_chrome_version = '.'.join(splitted_chrome_version[:3])
             
-            build = response_json["builds"][build_chrome_version]
-            for platforms in build['downloads']['chromedriver']:
-                if platforms['platform'] == platform_name:
-                    download_url = platforms['url']
+            metadata_file_name = "latest-patch-versions-per-build-with-downloads.json"
+            download_urls = self.__get_driver_metadata(metadata_file_name, platform_name)
+            download_url = download_urls.get(build_chrome_version, "")
+            if download_url == "":
+                download_urls = self.__get_driver_metadata(metadata_file_name, platform_name, is_revalidate=True)
+                download_url = download_urls.get(build_chrome_version, "")
                         
         return download_url
-
-    def __download_driver(self, chrome_version:str, platform_name:str = 'linux64'):
-        platform_name = self.__get_current_platfrom_for_driver_url()
-        download_url = self.__get_driver_url(chrome_version, platform_name)
-        result_download = True
-        drivers_dir_full_path = self.__get_drivers_path()
-        download_path = f"{drivers_dir_full_path}/{self.__driver_name}.zip"
-        
-        with open(download_path, "wb") as file:
-            response = requests.get(download_url)
-            if response.status_code == 404:
-                result_download = False
-                print(f"Download Chrome Driver Failed. status_code:{response.status_code} url:{download_url} ")
-            elif response.status_code == 200:
-                file.write(response.content)
+    
+    ################################################################################################################
+    ################################################################################################################
+    ################################################################################################################
+    # Driver Metadata Cache
+    '''
+    Download urls of chrome-for-testing metadata are saved in 'data/driver_metadata.json' as compact index.
+    {version or build: url} of one platform.
+    Index is used without request for 'driver_metadata_ttl' seconds,
+    after that it is revalidated by ETag/Last-Modified.
+    If request failed, index is used regardless of ttl.
+    '''
+    def __get_driver_metadata_path(self): return f"{self.__running_path}/{self.__data_dir_name}/driver_metadata.json"
+    
+    def __get_driver_metadata(self, metadata_file_name:str, platform_name:str, is_revalidate:bool = False) -> dict[str, str]:
+        '''
+        Parameter
+        -
+        metadata_file_name (str): 'known-good-versions-with-downloads.json' or 'latest-patch-versions-per-build-with-downloads.json'\n
+        platform_name (str): platform of driver\n
+        is_revalidate (bool): revalidate even if ttl is not expired\n
+        return
+        -
+        (dict[str, str]): {version or build: download url}
+        '''
+        import requests
+        metadata_path = self.__get_driver_metadata_path()
+        try:
+            with open(metadata_path, 'r') as file:
+                driver_metadata = json.load(file)
+        except (OSError, ValueError):
+            driver_metadata = {}
+        
+        cache_key = f"{platform_name}/{metadata_file_name}"
+        entry = driver_metadata.get(cache_key)
+        if entry and entry.get('base_url') != self.__driver_metadata_base_url:
+            entry = None
+        
+        if entry and not is_revalidate and time.time() - entry['fetched_at'] < self.__driver_metadata_ttl:
+            return entry['download_urls']
+        
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        
+        url = f"{self.__driver_metadata_base_url}/{metadata_file_name}"
+        try:
+            response = requests.get(url, headers=headers, timeout=30)
+        except requests.RequestException as e:
+            print(f"Request driver metadata failed. url:{url} {e}")
+            return entry['download_urls'] if entry else {}
+        
+        if response.status_code == 304 and entry:
+            entry['fetched_at'] = time.time()
+        elif response.status_code == 200:
+            if metadata_file_name == "known-good-versions-with-downloads.json":
+                download_urls = self.__index_known_good_versions(response.json(), platform_name)
             else:
-                print(f"Download Chrome Driver Failed. status_code:{response.status_code} url:{download_url} ")
+                download_urls = self.__index_latest_patch_versions(response.json(), platform_name)
+            entry = {
+                'base_url': self.__driver_metadata_base_url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': time.time(),
+                'download_urls': download_urls,
+            }
+        else:
+            print(f"Request driver metadata failed. status_code:{response.status_code} url:{url}")
+            return entry['download_urls'] if entry else {}
+        
+        driver_metadata[cache_key] = entry
+        try:
+            self.__write_json_file(metadata_path, driver_metadata)
+        except OSError as e:
+            print(f"Save driver metadata failed. {e}")
+        return entry['download_urls']
+    
+    def __index_known_good_versions(self, response_json:dict, platform_name:str) -> dict[str, str]:
+        download_urls = {}
+        for v in response_json['versions']:
+            for platforms in v['downloads'].get('chromedriver', []):
+                if platforms['platform'] == platform_name:
+                    download_urls[v['version']] = platforms['url']
+        return download_urls
+    
+    def __index_latest_patch_versions(self, response_json:dict, platform_name:str) -> dict[str, str]:
+        download_urls = {}
+        for build_version, build in response_json['builds'].items():
+            for platforms in build['downloads'].get('chromedriver', []):
+                if platforms['platform'] == platform_name:
+                    download_urls[build_version] = platforms['url']
+        return download_urls
+    
+    def __download_driver(self, chrome_version:str, platform_name:str = 'linux64') -> str:
+        '''
+        Only one process downloads driver. Other processes wait lock and use installed driver.\n
+        return
+        -
+        (str): installed driver file name. '' if failed.
+        '''
+        import zipfile
+        with self.__lock_driver_install():
+            self.__driver_manifest = None
+            driver_file_name = self.__find_driver_file(chrome_version)
+            if driver_file_name != "":
+                return driver_file_name
+            
+            platform_name = self.__get_current_platfrom_for_driver_url()
+            download_url = self.__get_driver_url(chrome_version, platform_name)
+            if download_url == "":
+                print(f"Download Chrome Driver Failed. Not found url. chrome_version:{chrome_version} platform:{platform_name}")
+                return ""
+            
+            drivers_dir_full_path = self.__get_drivers_path()
+            fd, download_path = tempfile.mkstemp(prefix=f".{self.__driver_name}.", suffix=".zip", dir=drivers_dir_full_path)
+            fd_driver, temp_driver_path = tempfile.mkstemp(prefix=f".{self.__driver_name}.", dir=drivers_dir_full_path)
+            os.close(fd_driver)
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    if not self.__stream_download(download_url, file):
+                        return ""
                 
-        result_filename = ""
-        if result_download:
-            with zipfile.ZipFile(download_path, 'r') as zip_ref:
-                zip_ref.extractall(drivers_dir_full_path)
-            src_path = f"{drivers_dir_full_path}/chromedriver-{platform_name}/{self.default_downloaded_driver_name}"
-            dst_path = f"{drivers_dir_full_path}/{self.__driver_name}"
-            os.rename(src_path, dst_path) # overwrite if exist dst 
-            os.chmod(dst_path, 755)
-            os.remove(download_path)
-            self.__remove_directory(f"{drivers_dir_full_path}/chromedriver-{platform_name}")
-            result_filename = self.__driver_name
-        return result_filename
+                with zipfile.ZipFile(download_path, 'r') as zip_ref:
+                    member_names = [name for name in zip_ref.namelist() if name.split('/')[-1] == self.default_downloaded_driver_name]
+                    if not member_names:
+                        print(f"Download Chrome Driver Failed. Not found '{self.default_downloaded_driver_name}' in zip. url:{download_url}")
+                        return ""
+                    # ZipExtFile checks CRC of member at end of read.
+                    with zip_ref.open(member_names[0]) as src, open(temp_driver_path, "wb") as dst:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+                os.chmod(temp_driver_path, 0o755)
+                
+                driver_version = self.__get_driver_version_by_file(temp_driver_path)
+                result_filename = self.__get_driver_file_name(chrome_version, driver_version)
+                os.replace(temp_driver_path, f"{drivers_dir_full_path}/{result_filename}")
+            except (OSError, zipfile.BadZipFile, subprocess.CalledProcessError) as e:
+                print(f"Install Chrome Driver Failed. url:{download_url} {e}")
+                return ""
+            finally:
+                for path in (download_path, temp_driver_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+            
+            self.__driver_manifest = None
+            return result_filename
+    
+    def __stream_download(self, download_url:str, file) -> bool:
+        '''
+        Write response to file by chunk and verify length and md5 checksum(x-goog-hash).
+        '''
+        import requests
+        import urllib3
+        md5 = hashlib.md5()
+        size = 0
+        try:
+            with requests.get(download_url, stream=True, timeout=60) as response:
+                if response.status_code != 200:
+                    print(f"Download Chrome Driver Failed. status_code:{response.status_code} url:{download_url} ")
+                    return False
+                
+                # Not decoded, md5 of x-goog-hash is of stored bytes.
+                for chunk in response.raw.stream(1024 * 1024, decode_content=False):
+                    file.write(chunk)
+                    md5.update(chunk)
+                    size += len(chunk)
+                headers = response.headers
+        # urllib3 errors of raw stream(ProtocolError, ReadTimeoutError) are not wrapped by requests.
+        except (requests.RequestException, urllib3.exceptions.HTTPError) as e:
+            print(f"Download Chrome Driver Failed. url:{download_url} {e}")
+            return False
+        
+        content_length = headers.get('Content-Length')
+        if content_length and int(content_length) != size:
+            print(f"Download Chrome Driver Failed. Content-Length:{content_length} downloaded:{size} url:{download_url}")
+            return False
+        
+        for goog_hash in headers.get('x-goog-hash', '').split(','):
+            hash_name, _, hash_value = goog_hash.strip().partition('=')
+            if hash_name == 'md5' and hash_value != base64.b64encode(md5.digest()).decode():
+                print(f"Download Chrome Driver Failed. Checksum mismatch. url:{download_url}")
+                return False
+        
+        print(f"Downloaded Chrome Driver. size:{size} url:{download_url}")
+        return True
     
     ################################################################################################################
     ################################################################################################################
     ################################################################################################################
     # Driver
+    def __create_driver(self,
+                        is_headless:bool,
+                        window_width:int,
+                        window_height:int,
+                        is_enable_image:bool,
+                        user_agent:str,
+                        profile_path:str = None,
+                        phases:dict[str, float] = None) -> webdriver.Chrome:
+        '''
+        Parameters
+        -
+        phases (dict[str, float]): seconds of 'version_detection', 'driver_resolution' and 'browser_launch' are added to it
+        '''
+        with _startup_phase(phases, 'version_detection'):
+            browser_binary_path = self.__get_browser_binary_path()
+            capability = self.__load_capability_cache(browser_binary_path, user_agent)
+        if capability:
+            driver_file_path = f"{self.__get_drivers_path()}/{capability['driver_file_name']}"
+            with _startup_phase(phases, 'browser_launch'):
+                return self.__get_driver(is_headless, driver_file_path, window_width, window_height, is_enable_image, capability['user_agent'], profile_path)
+        
+        requested_user_agent = user_agent
+        with _startup_phase(phases, 'version_detection'):
+            browser_version_by_bash = self.__get_browser_version_by_bash()
+        with _startup_phase(phases, 'driver_resolution'):
+            driver_file_name = self.__find_driver_file(browser_version_by_bash)
+            if driver_file_name == "":
+                driver_file_name = self.__download_driver(browser_version_by_bash)
+            
+        driver_file_path = f"{self.__get_drivers_path()}/{driver_file_name}"
+        with _startup_phase(phases, 'browser_launch'):
+            temp_driver = self.__get_driver(is_headless, driver_file_path, window_width, window_height, is_enable_image, user_agent, profile_path)
+        with _startup_phase(phases, 'version_detection'):
+            browser_version = self.__get_browser_version_by_driver(temp_driver)
+            driver_version = self.__get_driver_version(temp_driver)
+            user_agent = self.__get_user_agent(temp_driver)
+        with _startup_phase(phases, 'browser_launch'):
+            temp_driver.quit()
+        
+        with _startup_phase(phases, 'driver_resolution'):
+            if driver_file_name == self.default_downloaded_driver_name:
+                driver_file_name = self.__change_driver_filename(driver_file_name, browser_version, driver_version)
+                driver_file_path = f"{self.__get_drivers_path()}/{driver_file_name}"
+            
+            self.__save_capability_cache(browser_binary_path, requested_user_agent, driver_file_name, browser_version, driver_version, user_agent)
+        with _startup_phase(phases, 'browser_launch'):
+            return self.__get_driver(is_headless, driver_file_path, window_width, window_height, is_enable_image, user_agent, profile_path)
     
     def __get_user_agent(self, driver:webdriver.Chrome) -> str:
         user_agent:str = driver.execute_script("return navigator.userAgent")
@@ -545,7 +4246,10 @@ class ChromeWebdriver():
                      window_width:int, 
                      window_height:int, 
                      is_enable_image:bool, 
-                     user_agent:str == None) -> webdriver.Chrome:
+                     user_agent:str == None,
+                     profile_path:str = None) -> webdriver.Chrome:
+        if profile_path is None:
+            profile_path = self.__get_profile_path()
         options = webdriver.ChromeOptions()
         if is_headless:
             options.add_argument('headless')
@@ -557,7 +4261,7 @@ class ChromeWebdriver():
             options.add_argument('disable-user-media-security=true')
             options.add_argument('ignore-certificate-errors')
             options.add_argument(f'window-size={window_width},{window_height}')
-            options.add_argument(f'user-data-dir={self.__get_profile_path()}')
+            options.add_argument(f'user-data-dir={profile_path}')
         
         if user_agent:
             options.add_argument(f'user_agent={user_agent}')
@@ -567,33 +4271,613 @@ class ChromeWebdriver():
             options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
 
         options.add_argument('lang=ko_KR')
+        options.page_load_strategy = self.__page_load_strategy
         
+        from selenium.webdriver.chrome.service import Service
         service = Service(executable_path=driver_file_path)
         return webdriver.Chrome(service=service, options=options)
         
+    ################################################################################################################
+    ################################################################################################################
+    ################################################################################################################
+    # Tab Worker
+    async def __hold_tab_connection(self, connection):
+        import trio
+        self.__tab_root_connection = connection.cdp.get_connection_context('create_tab_workers')
+        self.__tab_connected_event.set()
+        await trio.sleep_forever()
+    
+    async def __create_tab(self, connection) -> tuple[str, Any]:
+        result = await self.__tab_root_connection.execute(_cdp_command('Target.createTarget', {'url': 'about:blank'}))
+        target_id = result['targetId']
+        session = await self.__tab_root_connection.connect_session(connection.devtools.target.TargetID(target_id))
+        await session.execute(_cdp_command('Page.enable'))
+        await session.execute(_cdp_command('Page.setLifecycleEventsEnabled', {'enabled': True}))
+        return target_id, session
+    
+    def __close_tab_workers(self):
+        for tab_worker in self.__tab_workers:
+            tab_worker.close()
+        self.__tab_workers = []
+        if self.__tab_devtools_thread:
+            self.__tab_devtools_thread.cancel()
+            self.__tab_devtools_thread = None
+            self.__tab_root_connection = None
+    
+    # Navigation Listener
+    '''Url and lifecycle of main frame by CDP Page events for 'event' wait strategy'''
+    def __reset_navigation_listener(self):
+        if self.__navigation_listener:
+            self.__navigation_listener.cancel()
+            self.__navigation_listener = None
+        self.__navigation_state.disconnect()
+        
+        if self.__wait_strategy != 'event':
+            return
+        
+        self.__navigation_listener = DevtoolsEventThread(self.__driver, self.__listen_navigation, name="navigation_listener")
+        if not self.__navigation_listener.start(timeout=10):
+            print("Navigation listener is not connected. Use 'poll' wait strategy.")
+    
+    async def __listen_navigation(self, connection):
+        devtools = connection.devtools
+        session = connection.session
+        listener = session.listen(devtools.page.FrameNavigated,
+                                  devtools.page.NavigatedWithinDocument,
+                                  devtools.page.LifecycleEvent,
+                                  buffer_size=1024)
+        try:
+            await session.execute(devtools.page.enable())
+            await session.execute(devtools.page.set_lifecycle_events_enabled(enabled=True))
+            frame_tree = await session.execute(devtools.page.get_frame_tree())
+            main_frame_id = frame_tree.frame.id_
+            self.__navigation_state.reset(frame_tree.frame.url + (frame_tree.frame.url_fragment or ''), str(frame_tree.frame.loader_id))
+            
+            async for event in listener:
+                if isinstance(event, devtools.page.FrameNavigated):
+                    if event.frame.parent_id is None:
+                        main_frame_id = event.frame.id_
+                        self.__navigation_state.set_url(event.frame.url + (event.frame.url_fragment or ''), True, str(event.frame.loader_id))
+                elif isinstance(event, devtools.page.NavigatedWithinDocument):
+                    if event.frame_id == main_frame_id:
+                        self.__navigation_state.set_url(event.url, False)
+                elif isinstance(event, devtools.page.LifecycleEvent):
+                    if event.frame_id == main_frame_id:
+                        self.__navigation_state.add_lifecycle_event(str(event.loader_id), event.name)
+        finally:
+            self.__navigation_state.disconnect()
+    
     ################################################################################################################
     ################################################################################################################
     ################################################################################################################
     # Websocket Listener
     '''CDP devtools regist'''
-    async def send_cancel_listner(self):
-        async with await trio.open_tcp_stream("127.0.0.1", 12346) as s:
-            await s.send_all(b'quit')
-        
-    async def wait_cancel_listener(self, cancel_scope):      
-        async def receiver(server_stream):    
-            await server_stream.receive_some(1024)    
-            cancel_scope.cancel()    
-        await trio.serve_tcp(receiver, 12346)
-        
-    async def set_websocket_listener(self, websocket_listening_function):
-        async with self.__driver.bidi_connection() as connection:
+    def reset_websocket_listener(self, websocket_listening_function):
+        '''
+        Parameter
+        -
+        websocket_listening_function: async function(listener). listener is async iterator of network.WebSocketFrameReceived.
+        '''
+        self.__websocket_listening_function = websocket_listening_function
+        if self.__websocket_listen_thread:
+            self.__websocket_listen_thread.cancel()
+        
+        async def listen(connection):
             await connection.session.execute(connection.devtools.network.enable())
             listener = connection.session.listen(connection.devtools.network.WebSocketFrameReceived) # selenium.webdriver.common.devtools.v114.network.WebSocketFrameReceived
-            async with trio.open_nursery() as nursery:
-                nursery.start_soon(websocket_listening_function, listener)
-                nursery.start_soon(self.wait_cancel_listener, nursery.cancel_scope)
+            await websocket_listening_function(listener)
+        
+        self.__websocket_listen_thread = DevtoolsEventThread(self.__driver, listen, name="websocket_listener")
+        self.__websocket_listen_thread.start()
     
-    def reset_websocket_listener(self, websocket_listening_function):
-        self.__websocket_listen_thread = threading.Thread(target=trio.run, args=(self.set_websocket_listener, *(websocket_listening_function,)))
-        self.__websocket_listen_thread.start()
\ No newline at end of file
+    def start_websocket_capture(self,
+                                buffer_size:int = 65536,
+                                overflow_policy:str = 'drop_oldest',
+                                batch_size:int = 256,
+                                batch_interval:float = 0.1,
+                                batch_function:Callable[[list[WebsocketFrame]], Any] = None,
+                                file_path:str = None) -> WebsocketCapture:
+        '''
+        Parameters
+        -
+        buffer_size (int): max frames in ring buffer\n
+        overflow_policy (str): 'drop_oldest', 'drop_newest' or 'block'\n
+        batch_size (int): max frames of a batch\n
+        batch_interval (float): max seconds to wait a batch is filled\n
+        batch_function (Callable[[list[WebsocketFrame]], Any]): called with batch in delivery thread\n
+        file_path (str): append frames as json lines\n
+        Returns
+        -
+        (WebsocketCapture) : get_batch() if batch_function and file_path are None. stats() for counters. close() to stop.
+        '''
+        capture = WebsocketCapture(buffer_size, overflow_policy, batch_size, batch_interval, batch_function, file_path)
+        if not capture.start(self.__driver):
+            capture.close()
+            raise WebDriverException("Devtools connection failed")
+        self.__websocket_captures.append(capture)
+        return capture
+    
+    def start_response_capture(self,
+                               url_patterns:list[str] = None,
+                               mime_types:list[str] = ('application/json',),
+                               resource_types:list[str] = ('XHR', 'Fetch'),
+                               max_body_bytes:int = 10 * 1024 * 1024,
+                               stream_threshold_bytes:int = None,
+                               queue_size:int = 1024,
+                               max_queue_bytes:int = 256 * 1024 * 1024,
+                               overflow_policy:str = 'drop_newest') -> ResponseCapture:
+        '''
+        Parameters
+        -
+        url_patterns (list[str]): wildcard '*' is allowed. ex) '*/api/*'. None captures all urls\n
+        mime_types (list[str]): prefix of MIME type. None captures all types\n
+        resource_types (list[str]): CDP Network.ResourceType. None captures all types\n
+        max_body_bytes (int): body over it is truncated\n
+        stream_threshold_bytes (int): stream body over it by Network.streamResourceContent in chunks. None uses Network.getResponseBody only\n
+        queue_size (int): max responses in queue\n
+        max_queue_bytes (int): max body bytes in queue\n
+        overflow_policy (str): 'drop_newest' or 'block'\n
+        Returns
+        -
+        (ResponseCapture) : get(timeout) or iterate for NetworkResponse. stats() for counters. close() to stop.
+        '''
+        capture = ResponseCapture(url_patterns, mime_types, resource_types, max_body_bytes, stream_threshold_bytes, queue_size, max_queue_bytes, overflow_policy)
+        if not capture.start(self.__driver):
+            capture.close()
+            raise WebDriverException("Devtools connection failed")
+        self.__response_captures.append(capture)
+        return capture
+
+
+class JobAsyncResult:
+    def __init__(self, ar:AsyncResult) -> None:
+        self.__ar = ar
+    
+    def get(self) -> Any:
+        return self.__ar.get()
+
+
+class ChromeWebdriverPool():
+    '''
+    N ChromeWebdriver behind one job scheduler.\n
+    Job: open url on an idle browser, then run read_function(driver:ChromeWebdriver).
+    '''
+    def __init__(self) -> None:
+        self.__drivers:list[ChromeWebdriver] = []
+        self.__idle_drivers:queue.Queue = None
+        self.__job_thread_pool:ThreadPool = None
+        self.__pending_job_semaphore:threading.BoundedSemaphore = None
+        
+    def initialize(self,
+                browser_count:int,
+                is_headless:bool,
+                profile_name_prefix:str = "pool",
+                max_pending_job_count_per_browser:int = 2,
+                base_dir:str = None,
+                **driver_options):
+        '''
+        Parameters
+        -
+        browser_count (int): count of browsers\n
+        is_headless (bool): headless browsers\n
+        profile_name_prefix (str): profile name of each browser is '{profile_name_prefix}{index}'\n
+        max_pending_job_count_per_browser (int): submit() blocks if 'browser_count * max_pending_job_count_per_browser' jobs are not finished.
+        The limit is shared by the pool, not per browser: job is bound to browser when a browser is idle, so a slow browser never holds queued jobs.\n
+        base_dir (str): directory of 'data_dir_name'. default: directory of caller file\n
+        driver_options: other parameters of ChromeWebdriver.initialize()
+        '''
+        if browser_count < 1:
+            raise ValueError("browser_count must be greater than 0")
+        
+        if not base_dir:
+            base_dir = _caller_directory(1)
+        
+        driver_options.pop('profile_name', None)
+        drivers = [ChromeWebdriver() for _ in range(browser_count)]
+        started_drivers:list[ChromeWebdriver] = [None] * browser_count
+        
+        def initialize_driver(index:int):
+            drivers[index].initialize(is_headless,
+                                      profile_name=f"{profile_name_prefix}{index}",
+                                      base_dir=base_dir,
+                                      **driver_options)
+            started_drivers[index] = drivers[index]
+        
+        from multiprocessing.pool import ThreadPool
+        try:
+            # First browser creates data directories and downloads driver.
+            initialize_driver(0)
+            if 1 < browser_count:
+                with ThreadPool(browser_count - 1) as initialize_thread_pool:
+                    initialize_thread_pool.map(initialize_driver, range(1, browser_count))
+        except:
+            # map() raises after all browsers are tried, so close every started one.
+            self.__drivers = started_drivers
+            self.close()
+            raise
+        
+        self.__drivers = drivers
+        self.__idle_drivers = queue.Queue()
+        for driver in self.__drivers:
+            self.__idle_drivers.put(driver)
+        
+        self.__job_thread_pool = ThreadPool(browser_count)
+        self.__pending_job_semaphore = threading.BoundedSemaphore(browser_count * max_pending_job_count_per_browser)
+    
+    def close(self):
+        if self.__job_thread_pool:
+            self.__job_thread_pool.close()
+            self.__job_thread_pool.join()
+            self.__job_thread_pool = None
+        
+        for driver in self.__drivers:
+            if driver:
+                driver.close()
+        self.__drivers = []
+    
+    def submit(self, timeout:float, url:str, read_function:Callable[[ChromeWebdriver], Any]) -> JobAsyncResult:
+        '''
+        Block if too many jobs are pending.\n
+        Parameters
+        -
+        timeout (float): timeout seconds of open\n
+        url (str): url\n
+        read_function (Callable[[ChromeWebdriver], Any]): run after open url\n
+        Returns
+        -
+        (JobAsyncResult) : JobAsyncResult.get() return result of read_function
+        '''
+        return JobAsyncResult(self.__submit(timeout, url, read_function))
+    
+    def imap_unordered(self, timeout:float, jobs:Iterable[tuple[str, Callable[[ChromeWebdriver], Any]]]) -> Iterator[Any]:
+        '''
+        Parameters
+        -
+        timeout (float): timeout seconds of open\n
+        jobs (Iterable[tuple[str, Callable]]): (url, read_function)\n
+        Returns
+        -
+        (Iterator) : results of read_function in completion order. Raise exception of failed job or of jobs iterator.
+        Closing iterator stops submitting jobs.
+        '''
+        completed_queue = queue.Queue()
+        stop_event = threading.Event()
+        
+        def feed_jobs():
+            job_count = 0
+            feed_exception = None
+            try:
+                for url, read_function in jobs:
+                    if stop_event.is_set():
+                        break
+                    self.__submit(timeout, url, read_function,
+                                  callback=lambda result: completed_queue.put((True, result)),
+                                  error_callback=lambda exception: completed_queue.put((False, exception)))
+                    job_count += 1
+            except Exception as e:
+                feed_exception = e
+            finally:
+                completed_queue.put((None, (job_count, feed_exception)))
+        
+        feed_thread = threading.Thread(target=feed_jobs, daemon=True)
+        feed_thread.start()
+        
+        try:
+            received_count = 0
+            job_count = None
+            while job_count is None or received_count < job_count:
+                is_success, value = completed_queue.get()
+                if is_success is None:
+                    job_count, feed_exception = value
+                    if feed_exception is not None:
+                        raise feed_exception
+                    continue
+                received_count += 1
+                if not is_success:
+                    raise value
+                yield value
+        finally:
+            stop_event.set()
+    
+    def __submit(self, timeout:float, url:str, read_function:Callable, callback=None, error_callback=None) -> AsyncResult:
+        self.__pending_job_semaphore.acquire()
+        try:
+            return self.__job_thread_pool.apply_async(self.__run_job,
+                                                      args=(timeout, url, read_function),
+                                                      callback=callback,
+                                                      error_callback=error_callback)
+        except:
+            self.__pending_job_semaphore.release()
+            raise
+    
+    def __run_job(self, timeout:float, url:str, read_function:Callable) -> Any:
+        driver:ChromeWebdriver = self.__idle_drivers.get()
+        try:
+            driver.open(timeout, url)
+            return read_function(driver)
+        finally:
+            self.__idle_drivers.put(driver)
+            self.__pending_job_semaphore.release()
+
+
+class AsyncChromeWebdriver():
+    '''
+    asyncio API of ChromeWebdriver.\n
+    Driver resolution and options are same as ChromeWebdriver.initialize().\n
+    Waits sleep in event loop and all pending element waits are checked by one script per poll,
+    so concurrent waits don't need thread. Url waits await CDP navigation events, and poll if not connected.
+    WebDriver commands run in 'command_thread_count' threads.\n
+    Cancel a wait by cancelling its asyncio task.
+    '''
+    def __init__(self) -> None:
+        self.__chrome_webdriver = ChromeWebdriver()
+        self.__browser_executor:ThreadPoolExecutor = None
+        self.__command_executor:ThreadPoolExecutor = None
+        self.__pending_element_waits:dict[tuple, list[asyncio.Future]] = {}
+        self.__element_waiter_task:asyncio.Task = None
+    
+    async def initialize(self,
+                         is_headless:bool,
+                         command_thread_count:int = 8,
+                         base_dir:str = None,
+                         **driver_options):
+        '''
+        Parameters
+        -
+        is_headless (bool): headless browser\n
+        command_thread_count (int): threads for WebDriver commands\n
+        base_dir (str): directory of 'data_dir_name'. default: current working directory. Coroutine has no caller file.\n
+        driver_options: other parameters of ChromeWebdriver.initialize()
+        '''
+        import asyncio
+        if not base_dir:
+            base_dir = os.getcwd()
+        
+        driver_options.pop('read_thread_count', None)
+        
+        self.__browser_executor = ThreadPoolExecutor(1)
+        self.__command_executor = ThreadPoolExecutor(command_thread_count)
+        initialize = functools.partial(self.__chrome_webdriver.initialize,
+                                       is_headless,
+                                       read_thread_count=1,
+                                       base_dir=base_dir,
+                                       **driver_options)
+        await asyncio.get_running_loop().run_in_executor(self.__browser_executor, initialize)
+    
+    async def close(self):
+        import asyncio
+        if self.__element_waiter_task:
+            self.__element_waiter_task.cancel()
+            self.__element_waiter_task = None
+        await asyncio.get_running_loop().run_in_executor(self.__browser_executor, self.__chrome_webdriver.close)
+        self.__browser_executor.shutdown()
+        self.__command_executor.shutdown()
+    
+    @property
+    def chrome_webdriver(self) -> ChromeWebdriver:
+        return self.__chrome_webdriver
+    
+    async def open(self,
+                   timeout:float,
+                   url:str,
+                   is_cancel_reads:bool = False,
+                   block_profiles:list[ResourceBlockProfile] = None) -> bool:
+        '''
+        Navigate by ChromeWebdriver.open_async(), so navigation epoch, recycle, standby and block profiles are applied.\n
+        Parameters
+        -
+        timeout (float): timeout seconds\n
+        url (str): check 'http://' and exist end '/'\n
+        is_cancel_reads (bool): same as ChromeWebdriver.open_async()\n
+        block_profiles (list[ResourceBlockProfile]): same as ChromeWebdriver.open_async()\n
+        Returns
+        -
+        (bool) : Return 'True' if equal url. Raise exception of navigation.
+        '''
+        import asyncio
+        navigation_result = self.__chrome_webdriver.open_async(url, is_cancel_reads, block_profiles)
+        navigation = asyncio.get_running_loop().run_in_executor(self.__browser_executor, navigation_result.get)
+        url_wait = asyncio.ensure_future(self.url_to_be(timeout, url))
+        try:
+            await asyncio.wait((navigation, url_wait), return_when=asyncio.FIRST_COMPLETED)
+            if navigation.done() and navigation.exception() is not None:
+                raise navigation.exception()
+            return await url_wait
+        finally:
+            url_wait.cancel()
+            if not navigation.done():
+                # Navigation is not cancellable. Keep order of browser executor.
+                navigation.add_done_callback(lambda f: f.exception())
+    
+    async def url_to_be(self, timeout:float, url:str) -> bool:
+        '''
+        Parameters
+        -
+        timeout (float): timeout seconds\n
+        url (str): url\n
+        Returns
+        -
+        (bool) : True. Raise TimeoutException if timeout.
+        '''
+        import asyncio
+        end_time = time.monotonic() + timeout
+        if self.__chrome_webdriver.navigation_state.is_connected:
+            if await self.__wait_navigation_state(lambda state: state.url == url, timeout):
+                return True
+            # Disconnected, fallback to polling.
+        while True:
+            current_url = await self.__run_command(lambda: self.__chrome_webdriver.driver.current_url)
+            if current_url == url:
+                return True
+            if end_time <= time.monotonic():
+                raise TimeoutException(f"Url is not '{url}'")
+            await asyncio.sleep(POLL_FREQUENCY)
+    
+    async def save_screenshot(self, filename:str) -> bool:
+        return await self.__run_command(self.__chrome_webdriver.driver.save_screenshot, filename)
+    
+    async def get_element_xpath(self, timeout:float, xpath:str) -> WebElement:
+        return await self.__wait_element(timeout, By.XPATH, xpath, False)
+    
+    async def get_element_id(self, timeout:float, id:str) -> WebElement:
+        return await self.__wait_element(timeout, By.ID, id, False)
+    
+    async def get_elements_by_tag_name(self, timeout:float, tag_name:str) -> list[WebElement]:
+        return await self.__wait_element(timeout, By.TAG_NAME, tag_name, True)
+    
+    async def get_elements_batch(self, timeout:float, locators:dict[str, tuple]) -> dict[str, Any]:
+        '''
+        Parameters
+        -
+        timeout (float): timeout seconds\n
+        locators (dict[str, tuple]): {name: (By, locator)} or {name: (By, locator, property_name)}\n
+        return
+        -
+        (dict[str, Any]): {name: WebElement or value of property}. Raise TimeoutException if not found.
+        '''
+        import asyncio
+        names = list(locators)
+        waits = [asyncio.ensure_future(self.__wait_element(timeout, locator[0], locator[1], False, locator[2] if 2 < len(locator) else None))
+                 for locator in locators.values()]
+        try:
+            results = await asyncio.gather(*waits)
+        finally:
+            # Failed or cancelled batch must not leave other waits polling.
+            for wait in waits:
+                wait.cancel()
+        return dict(zip(names, results))
+    
+    async def listen_websocket_frames(self, buffer_size:int = 1024) -> AsyncIterator:
+        '''
+        Async iterator of devtools network.WebSocketFrameReceived.\n
+        Frames are dropped if 'buffer_size' frames are not consumed.
+        '''
+        import asyncio
+        loop = asyncio.get_running_loop()
+        frame_queue = asyncio.Queue(buffer_size)
+        
+        def put_frame(event):
+            try:
+                frame_queue.put_nowait(event)
+            except asyncio.QueueFull:
+                pass
+        
+        async def listen(connection):
+            await connection.session.execute(connection.devtools.network.enable())
+            listener = connection.session.listen(connection.devtools.network.WebSocketFrameReceived, buffer_size=buffer_size)
+            async for event in listener:
+                loop.call_soon_threadsafe(put_frame, event)
+        
+        listen_thread = DevtoolsEventThread(self.__chrome_webdriver.driver, listen, name="async_websocket_listener")
+        is_connected = await loop.run_in_executor(None, listen_thread.start, 10)
+        if not is_connected:
+            raise WebDriverException("Devtools connection failed")
+        try:
+            while True:
+                yield await frame_queue.get()
+        finally:
+            await loop.run_in_executor(None, listen_thread.cancel)
+    
+    async def __run_command(self, function:Callable, *args) -> Any:
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(self.__command_executor, function, *args)
+    
+    async def __wait_navigation_state(self, predicate:Callable[[NavigationState], bool], timeout:float) -> bool:
+        '''
+        Await CDP navigation events in event loop, without thread.\n
+        return
+        -
+        (bool): False if timeout or disconnected
+        '''
+        import asyncio
+        navigation_state = self.__chrome_webdriver.navigation_state
+        loop = asyncio.get_running_loop()
+        changed_event = asyncio.Event()
+        listener = lambda: loop.call_soon_threadsafe(changed_event.set)
+        navigation_state.add_listener(listener)
+        try:
+            end_time = time.monotonic() + timeout
+            while True:
+                # Clear before check, so change after check wakes wait.
+                changed_event.clear()
+                if not navigation_state.is_connected:
+                    return False
+                if predicate(navigation_state):
+                    return True
+                remaining = end_time - time.monotonic()
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(changed_event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            navigation_state.remove_listener(listener)
+    
+    async def __wait_element(self, timeout:float, by:str, value:str, is_all:bool, property_name:str = None) -> Any:
+        import asyncio
+        key = (by, value, is_all, property_name)
+        future = asyncio.get_running_loop().create_future()
+        self.__pending_element_waits.setdefault(key, []).append(future)
+        if self.__element_waiter_task is None:
+            self.__element_waiter_task = asyncio.create_task(self.__run_element_waiter())
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutException(f"Not found element. by:{by} value:{value}") from None
+    
+    async def __run_element_waiter(self):
+        '''
+        Check all pending element waits by one script per poll.
+        '''
+        import asyncio
+        try:
+            while True:
+                for key in list(self.__pending_element_waits):
+                    futures = [f for f in self.__pending_element_waits[key] if not f.done()]
+                    if futures:
+                        self.__pending_element_waits[key] = futures
+                    else:
+                        del self.__pending_element_waits[key]
+                if not self.__pending_element_waits:
+                    break
+                
+                keys = list(self.__pending_element_waits)
+                locators = [[str(index), by, value, property_name, is_all] for index, (by, value, is_all, property_name) in enumerate(keys)]
+                try:
+                    found, errors = await self.__run_command(self.__chrome_webdriver.driver.execute_script, _FIND_ELEMENTS_BATCH_SCRIPT, locators)
+                except WebDriverException:
+                    # Navigation while script is running.
+                    found, errors = {}, {}
+                
+                for index, key in enumerate(keys):
+                    name = str(index)
+                    if name in found or name in errors:
+                        for future in self.__pending_element_waits.pop(key):
+                            if future.done():
+                                continue
+                            if name in found:
+                                future.set_result(found[name])
+                            else:
+                                future.set_exception(InvalidSelectorException(errors[name]))
+                
+                if self.__pending_element_waits:
+                    await asyncio.sleep(POLL_FREQUENCY)
+        except BaseException as e:
+            # Pending waits would hang until their timeout.
+            for futures in self.__pending_element_waits.values():
+                for future in futures:
+                    if future.done():
+                        continue
+                    if isinstance(e, Exception):
+                        future.set_exception(e)
+                    else:
+                        future.cancel()
+            self.__pending_element_waits.clear()
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            self.__element_waiter_task = None
+
+
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_START_TIME